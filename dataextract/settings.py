@@ -131,8 +131,134 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Uploads above this size are streamed to a TemporaryUploadedFile on disk, and the
+# extractor hands that path straight to the rasterizer, so it stays small.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(2.5 * 1024 * 1024)  # 2.5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+PDF_UPLOAD_MAX_SIZE = 100 * 1024 * 1024  # 100MB
+
+# JSON API: how long extraction results stay fetchable by result_id (seconds)
+EXTRACTION_RESULT_TTL = 60 * 60
+
+# Caches. API results live in the "results" cache (EXTRACTION_RESULT_CACHE), which
+# must be shared by every server process: the next page of a result may be served
+# by another worker. The file-based cache covers one host; across hosts point it
+# at Redis or the database cache. Every set lists the cache directory, so
+# MAX_ENTRIES stays small: a few hours of uploads at the admission limits. Once
+# it is reached, ResultFileCache deletes results past EXTRACTION_RESULT_TTL
+# (including never-fetched ones) before culling any live result.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'results': {
+        'BACKEND': 'extractor.cache.ResultFileCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'results'),
+        'TIMEOUT': EXTRACTION_RESULT_TTL,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+EXTRACTION_RESULT_CACHE = 'results'
+
+# Build and warm the shared extractor (patterns, layout memory, Tesseract) when a
+# server process starts (wsgi.py/asgi.py, runserver included); manage.py commands don't
+EXTRACTOR_WARM_ON_STARTUP = True
+
+# Admission control: extractions allowed to run at once, how many may wait for a
+# slot, how long they wait (seconds), and the Retry-After sent with a 503
+EXTRACTOR_MAX_CONCURRENT = 2
+EXTRACTOR_MAX_QUEUE = 8
+EXTRACTOR_QUEUE_TIMEOUT = 120
+EXTRACTOR_RETRY_AFTER = 30
+
+# Page renderer: "pdfium" (in-process, grayscale numpy, needs pypdfium2), "pdf2image"
+# (poppler's pdftoppm) or "auto" (PDFium when installed; pdf2image is always the fallback)
+EXTRACTOR_RENDERER = 'auto'
+
+# Run Tesseract in this many worker processes, with pages passed in shared memory
+# (0 = OCR in the request's own process, "auto" = one per core)
+EXTRACTOR_OCR_PROCESSES = 0
+
+# Overlap rasterization, preprocessing and OCR page by page with this many worker
+# threads per stage, e.g. {"rasterize": 1, "preprocess": 1, "ocr": 2}; None keeps
+# them as whole-document phases. Per-stage utilization is reported in debug["pipeline"].
+EXTRACTOR_PIPELINE_WORKERS = None
+EXTRACTOR_PIPELINE_QUEUE_SIZE = 2
+
+# Split the cores between in-flight documents: pdftoppm threads, Tesseract's
+# OMP_THREAD_LIMIT and pipeline OCR workers follow each document's share.
+# EXTRACTOR_CORES overrides the detected count (affinity / cgroup quota).
+EXTRACTOR_CORE_BUDGET = False
+EXTRACTOR_CORES = None
+
+# Detect ruled component tables and assign the page's OCR words to their cells
+# by the ruling lines (no extra Tesseract calls); items without a detected
+# table use the free-text component parser
+EXTRACTOR_TABLE_CELLS = False
+
+# Read global fields from the OCR words at their learned header positions when
+# the header matches a layout learned with the learn_field_positions command;
+# the regex parser fills the gaps
+EXTRACTOR_FIELD_ROIS = False
+
+# Save each extraction's OCR output here as a parser fixture for
+# "python manage.py benchmark_parser" (None disables recording)
+EXTRACTOR_FIXTURE_DIR = None
+
+# Memory budget for decoded page rasters per extraction (MB, None = unlimited).
+# Over budget the extractor renders at a lower DPI (not below EXTRACTOR_MIN_DPI),
+# then streams one page at a time, and refuses documents that can't fit at all.
+EXTRACTOR_MEMORY_BUDGET_MB = None
+EXTRACTOR_MIN_DPI = 200
+
+# Triage pages on 30 DPI thumbnails before OCR: blank pages and known boilerplate
+# (learned with "python manage.py learn_boilerplate") are skipped, header-only pages
+# get a cropped OCR
+EXTRACTOR_CLASSIFY_PAGES = False
+
+# Stop OCR once the last PO's trailing boilerplate has been seen and the next page
+# holds no PO number, item line or component row anywhere; that page and the rest are
+# dropped. Off by default: a PO that breaks that pattern would lose data silently.
+# Add ?force_full=1 to an upload to OCR every page anyway.
+EXTRACTOR_EARLY_TERMINATION = False
+
+# cProfile every extraction (staff can also add ?profile=1 to a single upload);
+# artifacts are saved to EXTRACTOR_PROFILE_DIR and linked from the result's debug section
+EXTRACTOR_PROFILE = False
+EXTRACTOR_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Record a Chrome Trace Event timeline of every extraction (staff: ?trace=1 for one upload)
+EXTRACTOR_TRACE = False
+EXTRACTOR_TRACE_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Columnar export: date-partitioned dataset of the flattened Excel rows ("parquet" or "csv"),
+# with PO/item columns on every row and typed rates, weights, costs and dates
+EXPORT_DATASET_DIR = os.path.join(BASE_DIR, 'exports', 'po_rows')
+EXPORT_DATASET_FORMAT = 'parquet'
+
+# Write-behind export: queue every successful extraction for the daily workbook
+# (and the dataset when EXPORT_DATASET_ENABLED), flushing in batches of
+# EXPORT_BATCH_ROWS rows or every EXPORT_FLUSH_INTERVAL seconds.
+# EXPORT_OUTPUT_DIR = None writes to the Desktop.
+# Flushes append to the workbook's "<workbook>.rows.csv" row log; the .xlsx is
+# rebuilt from it at day rollover, on shutdown, and EXPORT_WORKBOOK_REFRESH seconds
+# after new rows arrive (None = rollover and shutdown only).
+EXPORT_ON_EXTRACT = False
+EXPORT_OUTPUT_DIR = None
+EXPORT_BATCH_ROWS = 500
+EXPORT_FLUSH_INTERVAL = 5.0
+EXPORT_WORKBOOK_REFRESH = 300.0
+EXPORT_DATASET_ENABLED = False
+
+# Hot folder ingestion (python manage.py watch_folder): PDFs dropped in HOT_FOLDER_DIR
+# are extracted once their size has been stable for HOT_FOLDER_SETTLE_SECONDS and moved
+# to the done/failed folders (default: subfolders of HOT_FOLDER_DIR)
+HOT_FOLDER_DIR = os.path.join(BASE_DIR, 'hot_folder')
+HOT_FOLDER_DONE_DIR = None
+HOT_FOLDER_FAILED_DIR = None
+HOT_FOLDER_WORKERS = 2
+HOT_FOLDER_POLL_INTERVAL = 5.0
+HOT_FOLDER_SETTLE_SECONDS = 3.0
 
 # Media files
 MEDIA_URL = '/media/'
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dataextract.settings')
 
 application = get_wsgi_application()
+
+# Warm the shared extractor in server processes only, not in manage.py commands
+from extractor.pool import warm_up_on_startup  # noqa: E402
+
+warm_up_on_startup()
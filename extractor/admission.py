@@ -0,0 +1,105 @@
+# extractor/admission.py
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when the extraction queue is full (or the wait timed out)"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps concurrent extractions and bounds how many requests may wait for a slot"""
+
+    def __init__(self, max_concurrent=2, max_queue=8, queue_timeout=120, retry_after=30):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def admit(self):
+        with self._cond:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    admission_rejections.inc(reason="queue_full")
+                    raise AdmissionRejected("Extraction queue is full", self.retry_after)
+
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self.active < self.max_concurrent, self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+
+                if not admitted:
+                    self.rejected += 1
+                    admission_rejections.inc(reason="timeout")
+                    raise AdmissionRejected("Timed out waiting for an extraction slot", self.retry_after)
+
+            self.active += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected,
+            }
+
+    def saturation(self):
+        """Fraction of extraction slots in use"""
+        with self._cond:
+            return self.active / self.max_concurrent
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """Return the process-wide admission controller configured from settings"""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    max_concurrent=getattr(settings, "EXTRACTOR_MAX_CONCURRENT", 2),
+                    max_queue=getattr(settings, "EXTRACTOR_MAX_QUEUE", 8),
+                    queue_timeout=getattr(settings, "EXTRACTOR_QUEUE_TIMEOUT", 120),
+                    retry_after=getattr(settings, "EXTRACTOR_RETRY_AFTER", 30),
+                )
+    return _controller
+
+
+admission_rejections = metrics.registry.counter(
+    "extractor_admission_rejections_total", "Requests turned away by admission control", ("reason",))
+metrics.registry.gauge(
+    "extractor_queue_depth", "Requests waiting for an extraction slot",
+    lambda: get_admission_controller().stats()["queue_depth"])
+metrics.registry.gauge(
+    "extractor_active_extractions", "Extractions running now",
+    lambda: get_admission_controller().stats()["active"])
+metrics.registry.gauge(
+    "extractor_worker_saturation", "Fraction of EXTRACTOR_MAX_CONCURRENT slots in use",
+    lambda: get_admission_controller().saturation())
@@ -0,0 +1,203 @@
+# extractor/api.py
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import Paginator
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed
+from django.views.decorators.csrf import csrf_exempt
+
+from . import metrics
+from .admission import AdmissionRejected, get_admission_controller
+from .exporters import EXPORT_COLUMNS, export_frame, flatten_po_frame
+from .pool import extract_document
+from .profiling import force_full_requested, profile_path, profiling_requested, trace_path, tracing_requested
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sections that are only returned when asked for with ?include=debug,accuracy
+# (debug.profile / debug.trace link the cProfile and trace artifacts when requested)
+OPTIONAL_SECTIONS = ("debug", "accuracy")
+# ?include=rows adds the page's POs as flattened export rows (same columns as the Excel export)
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+RESULT_CACHE_PREFIX = "extraction-result:"
+
+
+def _json_default(obj):
+    if isinstance(obj, (datetime, timedelta)):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_compact(data):
+    """Serialize to compact UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=_json_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps_compact(data), status=status, content_type="application/json")
+
+
+def normalize_purchase_orders(result):
+    """Return the list of POs for both the single-PO and multi-PO result shapes"""
+    if "purchase_orders" in result:
+        return result["purchase_orders"]
+    if "global" in result:
+        return [{
+            "po_number": result.get("po_number", result["global"].get("PO #", "")),
+            "global": result["global"],
+            "items": result.get("items", []),
+            "item_count": result.get("item_count", len(result.get("items", []))),
+            "component_count": result.get("component_count", 0),
+        }]
+    return []
+
+
+def build_api_payload(result_id, record, page=1, page_size=DEFAULT_PAGE_SIZE, include=()):
+    """Build one page of an extraction result, paginated by purchase order"""
+    result = record["result"]
+    purchase_orders = normalize_purchase_orders(result)
+    paginator = Paginator(purchase_orders, page_size, allow_empty_first_page=True)
+    page_obj = paginator.get_page(page)
+
+    payload = {
+        "result_id": result_id,
+        "filename": record.get("filename", ""),
+        "total_pos": paginator.count,
+        "page": page_obj.number,
+        "page_size": page_size,
+        "num_pages": paginator.num_pages,
+        "summary": result.get("summary", {
+            "total_pos": paginator.count,
+            "total_items": sum(po.get("item_count", 0) for po in purchase_orders),
+            "total_components": sum(po.get("component_count", 0) for po in purchase_orders),
+        }),
+        "purchase_orders": list(page_obj.object_list),
+    }
+    for section in OPTIONAL_SECTIONS:
+        if section in include and section in result:
+            payload[section] = result[section]
+    if "rows" in include:
+        rows = export_frame(flatten_po_frame({"purchase_orders": payload["purchase_orders"]}))
+        payload["rows"] = {"columns": EXPORT_COLUMNS, "data": rows.values.tolist()}
+    return payload
+
+
+def _parse_query(request):
+    """Read page, page_size and include from the query string"""
+    try:
+        page_size = int(request.GET.get("page_size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    page = request.GET.get("page", 1)
+    include = {part.strip() for part in request.GET.get("include", "").split(",") if part.strip()}
+    return page, page_size, include
+
+
+def _result_ttl():
+    return getattr(settings, "EXTRACTION_RESULT_TTL", 3600)
+
+
+def result_cache():
+    """The cache results are stored in (EXTRACTION_RESULT_CACHE); it must be shared by every server process"""
+    return caches[getattr(settings, "EXTRACTION_RESULT_CACHE", "default")]
+
+
+@csrf_exempt
+def extract_api(request):
+    """POST a PDF as ``pdf_file``; returns the first page of POs and a result_id for the rest"""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    pdf_file = request.FILES.get("pdf_file")
+    if not pdf_file:
+        return json_response({"error": "Missing 'pdf_file' upload"}, status=400)
+    max_size = getattr(settings, "PDF_UPLOAD_MAX_SIZE", None)
+    if max_size and pdf_file.size > max_size:
+        return json_response({"error": f"Max file size is {max_size // (1024 * 1024)}MB"}, status=413)
+
+    try:
+        result = extract_document(pdf_file, profile=profiling_requested(request), trace=tracing_requested(request),
+                                  force_full=force_full_requested(request))
+    except AdmissionRejected as e:
+        response = json_response({"error": str(e), "retry_after": e.retry_after}, status=503)
+        response["Retry-After"] = str(e.retry_after)
+        return response
+
+    if "error" in result:
+        return json_response({"error": result.get("error"), "details": result.get("details", "")}, status=422)
+
+    result_id = uuid.uuid4().hex
+    record = {"filename": pdf_file.name, "result": result}
+    result_cache().set(RESULT_CACHE_PREFIX + result_id, record, _result_ttl())
+
+    page, page_size, include = _parse_query(request)
+    return json_response(build_api_payload(result_id, record, page, page_size, include))
+
+
+def extraction_result_api(request, result_id):
+    """GET further pages of a stored extraction result"""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    record = result_cache().get(RESULT_CACHE_PREFIX + result_id)
+    metrics.record_cache_lookup("results", record is not None)
+    if record is None:
+        return json_response({"error": "Unknown or expired result_id"}, status=404)
+
+    page, page_size, include = _parse_query(request)
+    return json_response(build_api_payload(result_id, record, page, page_size, include))
+
+
+def extraction_status_api(request):
+    """Report running extractions and queue depth"""
+    return json_response(get_admission_controller().stats())
+
+
+def profile_api(request, profile_id):
+    """Staff-only download of a saved extraction profile (summary text, or ?format=prof for pstats)"""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_staff:
+        return json_response({"error": "Not found"}, status=404)
+
+    raw = request.GET.get("format") == "prof"
+    path = profile_path(profile_id, ".prof" if raw else ".txt")
+    if path is None or not os.path.exists(path):
+        return json_response({"error": "Unknown profile"}, status=404)
+    if raw:
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=os.path.basename(path))
+    return FileResponse(open(path, "rb"), content_type="text/plain; charset=utf-8")
+
+
+def trace_api(request, trace_id):
+    """Staff-only download of a saved extraction trace (Chrome Trace Event JSON)"""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_staff:
+        return json_response({"error": "Not found"}, status=404)
+
+    path = trace_path(trace_id)
+    if path is None or not os.path.exists(path):
+        return json_response({"error": "Unknown trace"}, status=404)
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=os.path.basename(path),
+                        content_type="application/json")
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's metrics registry"""
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    return HttpResponse(metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
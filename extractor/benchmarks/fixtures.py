@@ -0,0 +1,91 @@
+# extractor/benchmarks/fixtures.py
+"""Recorded OCR output for replaying the parser without Tesseract or poppler.
+
+A fixture is a gzipped JSON file holding exactly what
+``extract_text_with_coordinates`` returned for one document, so
+``HybridPDFOCRExtractor.parse_ocr_output`` can be re-run on it in
+isolation.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+from .synthetic import generate_document
+
+FIXTURE_VERSION = 1
+FIXTURE_SUFFIX = ".ocr.json.gz"
+DEFAULT_FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def save_fixture(fixture_dir, source_name, all_text, all_lines, text_with_coords):
+    """Write one document's OCR output and return the fixture path"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.splitext(source_name)[0]) or "document"
+    path = Path(fixture_dir) / f"{stem}{FIXTURE_SUFFIX}"
+    data = {
+        "version": FIXTURE_VERSION,
+        "source": source_name,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "all_text": all_text,
+        "all_lines": all_lines,
+        "text_with_coords": text_with_coords,
+    }
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_fixture(path):
+    """Read a fixture written by ``save_fixture``"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != FIXTURE_VERSION:
+        raise ValueError(f"{path}: unsupported fixture version {data.get('version')}")
+    return data
+
+
+def find_fixtures(paths):
+    """Expand files and directories into a sorted list of fixture paths"""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(path.glob(f"*{FIXTURE_SUFFIX}")))
+        elif path.exists():
+            found.append(path)
+    return found
+
+
+def synthetic_fixture(spec, dpi=300, font_size=9):
+    """Build a fixture from a generated document, with word boxes laid out as ``write_text_pdf`` places them"""
+    document = generate_document(spec)
+    scale = dpi / 72
+    char_width_pt = font_size * 0.6  # Courier
+    line_height_pt = font_size * 1.5
+    all_text, all_lines, text_with_coords = "", [], []
+    for page_num, page in enumerate(document.pages):
+        all_text += f"\n#page {page_num + 1}\n" + "\n".join(page)
+        all_lines.extend(page)
+        for row, line in enumerate(page):
+            y = int((50 - font_size + row * line_height_pt) * scale)
+            for match in re.finditer(r"\S+", line):
+                text_with_coords.append({
+                    "text": match.group(),
+                    "x": int((40 + match.start() * char_width_pt) * scale),
+                    "y": y,
+                    "width": int(len(match.group()) * char_width_pt * scale),
+                    "height": int(font_size * scale),
+                    "page": page_num,
+                })
+    return {
+        "version": FIXTURE_VERSION,
+        "source": f"synthetic:{spec.seed}",
+        "all_text": all_text,
+        "all_lines": all_lines,
+        "text_with_coords": text_with_coords,
+        "expected": document.expected,
+    }
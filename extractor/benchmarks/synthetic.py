@@ -0,0 +1,206 @@
+# extractor/benchmarks/synthetic.py
+"""Synthetic Richline-style purchase order PDFs for benchmarking.
+
+Documents are generated locally from a seed, either as text-layer PDFs (a
+minimal hand-written PDF with Courier text) or as "scanned" image-only PDFs
+rendered with PIL with a little skew and noise.
+"""
+import os
+import random
+from dataclasses import dataclass, field
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+PAGE_WIDTH_PT = 612
+PAGE_HEIGHT_PT = 792
+LINES_PER_PAGE = 48
+
+VENDOR_NAMES = ["Shree Gems Pvt Ltd", "Aurum Castings Inc", "Golden Line Jewels LLC", "Star Setters Limited"]
+ORDER_TYPES = ["STOCK", "MCH", "SPC", "SUPPLY"]
+METALS = ["14KY", "14KW", "10KY", "18KW", "SS", "SS/14KY"]
+PRODUCTS = ["RING", "PENDANT", "EARRING", "BRACELET", "NECKLACE"]
+POLICIES = ["By Vendor", "Richline Supply", "Customer Supply"]
+TERMS_LINES = [
+    "TERMS AND CONDITIONS OF PURCHASE",
+    "1. Acceptance. This purchase order is an offer by the buyer and acceptance is",
+    "   limited to its terms. Any additional or different terms are rejected.",
+    "2. Delivery. Time is of the essence. Goods must ship by the due date shown.",
+    "3. Quality. All goods are subject to inspection and assay on receipt.",
+    "4. Invoicing. Invoices must reference the purchase order and job numbers.",
+    "5. Compliance. Vendor certifies conformity with all applicable regulations.",
+]
+
+
+@dataclass
+class POSpec:
+    """Shape of one synthetic document"""
+    rpos: int = 1
+    items_per_po: int = 2
+    components_per_item: int = 3
+    scanned: bool = False
+    terms_pages: int = 0
+    seed: int = 0
+
+
+@dataclass
+class SyntheticDocument:
+    spec: POSpec
+    pages: list
+    expected: dict = field(default_factory=dict)
+
+
+def generate_document(spec):
+    """Build the page lines for a document plus the counts a perfect extraction would find"""
+    rng = random.Random(spec.seed)
+    lines = []
+    expected = {"purchase_orders": 0, "items": 0, "components": 0, "po_numbers": []}
+
+    for _ in range(spec.rpos):
+        rpo = f"RPO{rng.randint(900000, 999999)}"
+        expected["purchase_orders"] += 1
+        expected["po_numbers"].append(rpo)
+        gold, platinum, silver = rng.uniform(1900, 2700), rng.uniform(850, 1400), rng.uniform(18, 45)
+        lines += [
+            "RICHLINE GROUP",
+            f"PURCHASE ORDER {rpo}",
+            f"PO Date {rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2025   Location {rng.choice(['NYC', 'PRV', 'ATL'])}",
+            f"Vendor ID V{rng.randint(1000, 9999)}",
+            rng.choice(VENDOR_NAMES),
+            f"Due Date {rng.choice(['January', 'March', 'June', 'October'])} {rng.randint(1, 28)}, 2025",
+            "Order Type Gold Platinum Silver",
+            f"{rng.choice(ORDER_TYPES)} {gold:,.2f} {platinum:,.2f} {silver:.2f}",
+            "Item No Description Pieces Unit Cost",
+        ]
+        for _ in range(spec.items_per_po):
+            expected["items"] += 1
+            prefix = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ") for _ in range(2))
+            item = f"{prefix}{rng.randint(1000, 9999)}{rng.choice(['XYZ', 'Q1', 'R2K'])}"
+            lines += [
+                f"{item} {prefix}{rng.randint(100, 999)} {rng.choice(METALS)} {rng.choice(PRODUCTS)} "
+                f"RFP{rng.randint(1000000, 9999999)} {rng.randint(1, 500)}.00 EA",
+                f"Stone PC: {rng.uniform(0.5, 9):.2f} Labor PC: {rng.uniform(1, 20):.2f}",
+                f"CAST Fin WT Gold: {rng.uniform(0.5, 9):.3f} Silver: {rng.uniform(0.1, 5):.3f}",
+                f"LOSS % Gold: {rng.uniform(1, 8):.1f}% Silver: {rng.uniform(1, 8):.1f}%",
+                f"Ext. Gross Wt.: {rng.uniform(1, 40):.3f} GR",
+                "Supplied by Component Setting Cost Tot. Weight",
+            ]
+            for _ in range(spec.components_per_item):
+                expected["components"] += 1
+                lines.append(
+                    f"{rng.choice(POLICIES)} CS{rng.randint(1, 9)}/{rng.choice(['1.5', '2', '2.5'])}"
+                    f"{rng.choice(['NV', 'OV', 'PS'])}-{rng.choice(['ABC', 'W12', 'Y7'])} "
+                    f"{rng.uniform(5.5, 90):.2f} {rng.uniform(0.01, 2):.3f} CT"
+                )
+        lines += [
+            "Weight tolerance +/- 5% applies to all cast items.",
+            "There is a market price adjustment for precious metal content.",
+        ]
+
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    pages += [list(TERMS_LINES) for _ in range(spec.terms_pages)]
+    return SyntheticDocument(spec=spec, pages=pages, expected=expected)
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path, pages, font_size=9):
+    """Write a minimal PDF with one Courier text line per input line"""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+    page_ids = []
+    leading = font_size * 1.5
+    for page_lines in pages:
+        ops = [f"BT /F1 {font_size} Tf {leading:.1f} TL 40 {PAGE_HEIGHT_PT - 50} Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in page_lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 {PAGE_WIDTH_PT} {PAGE_HEIGHT_PT}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>".encode()
+        ))
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_obj} 0 R >>".encode()
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects[pages_obj - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_scanned_pdf(path, pages, dpi=150, seed=0):
+    """Write an image-only PDF that looks like a scan: rendered text, slight skew and speckle noise"""
+    rng = np.random.default_rng(seed)
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    font_size = max(8, int(dpi * 9 / 72))
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        font = ImageFont.load_default()
+
+    images = []
+    for page_lines in pages:
+        image = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(image)
+        y = int(dpi * 50 / 72)
+        for line in page_lines:
+            draw.text((int(dpi * 40 / 72), y), line, fill=0, font=font)
+            y += int(font_size * 1.5)
+        image = image.rotate(float(rng.uniform(-0.6, 0.6)), fillcolor=255, resample=Image.BILINEAR)
+        pixels = np.asarray(image).copy()
+        speckle = rng.random(pixels.shape) < 0.002
+        pixels[speckle] = 0
+        images.append(Image.fromarray(pixels))
+
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+
+
+def write_document(document, path):
+    if document.spec.scanned:
+        write_scanned_pdf(path, document.pages, seed=document.spec.seed)
+    else:
+        write_text_pdf(path, document.pages)
+    return path
+
+
+# Named corpus profiles used by the benchmark command
+PROFILES = {
+    "single": POSpec(rpos=1, items_per_po=2, components_per_item=3),
+    "multi": POSpec(rpos=5, items_per_po=4, components_per_item=4),
+    "scanned": POSpec(rpos=3, items_per_po=3, components_per_item=3, scanned=True),
+    "appendix": POSpec(rpos=2, items_per_po=3, components_per_item=2, terms_pages=4),
+    "large": POSpec(rpos=20, items_per_po=5, components_per_item=5),
+}
+
+
+def generate_corpus(out_dir, profiles=None, docs_per_profile=3, seed=0):
+    """Write docs_per_profile PDFs for each profile; returns [(profile, path, SyntheticDocument)]"""
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for profile_idx, name in enumerate(profiles or PROFILES):
+        base = PROFILES[name]
+        for i in range(docs_per_profile):
+            spec = POSpec(**{**base.__dict__, "seed": seed * 100_000 + profile_idx * 1000 + i})
+            document = generate_document(spec)
+            path = os.path.join(out_dir, f"{name}_{i:03d}.pdf")
+            corpus.append((name, write_document(document, path), document))
+    return corpus
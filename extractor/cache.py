@@ -0,0 +1,26 @@
+# extractor/cache.py
+"""File-based cache for API results that drops expired results first.
+
+Django's FileBasedCache only deletes an expired entry when it is read, and
+once MAX_ENTRIES files exist it culls a random share of them, fresh ones
+included. Results that are never fetched would pile up until then. Here the
+cull first sweeps out everything past its TTL and only falls back to the
+random cull if the live entries alone still reach MAX_ENTRIES.
+"""
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class ResultFileCache(FileBasedCache):
+    def _cull(self):
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        live = 0
+        for fname in filelist:
+            try:
+                with open(fname, "rb") as f:
+                    live += not self._is_expired(f)
+            except FileNotFoundError:
+                pass  # Deleted by another process meanwhile
+        if live >= self._max_entries:
+            super()._cull()
@@ -0,0 +1,799 @@
+# extractor/exporters.py
+import atexit
+import csv
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+
+logger = logging.getLogger("pdf_extractor")
+
+# Column order of the flattened export rows
+EXPORT_COLUMNS = [
+    'Extraction_Date', 'Extraction_Time', 'PO #', 'Location', 'PO Date', 'Due Date', 'Vendor ID #', 'Order Type',
+    'Gold Rate', 'Platinum Rate', 'Silver Rate', 'Job #', 'Richline Item #', 'Vendor Item #',
+    'Fin Weight (Gold)', 'Stone Labor', 'Component', 'Supply Policy', 'Tot. Weight', 'Cost ($)'
+]
+
+
+def daily_export_path(base_filename="Daily_PO_Extracts", output_dir=None, date=None):
+    """Path of the daily workbook, on the Desktop unless output_dir is given"""
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    output_dir = output_dir or os.path.join(os.path.expanduser("~"), "Desktop")
+    return os.path.join(output_dir, f"{base_filename}_{date}.xlsx")
+
+
+# Export columns filled from a PO's global data, an item, and a component
+PO_HEADER_FIELDS = ['PO #', 'Location', 'PO Date', 'Due Date', 'Vendor ID #', 'Order Type',
+                    'Gold Rate', 'Platinum Rate', 'Silver Rate']
+ITEM_FIELDS = ['Job #', 'Richline Item #', 'Vendor Item #', 'Fin Weight (Gold)', 'Stone Labor']
+COMPONENT_FIELDS = ['Component', 'Supply Policy', 'Tot. Weight', 'Cost ($)']
+
+
+def _purchase_orders(results):
+    """POs from one result or a list of results, in either the single or multi-PO shape"""
+    if isinstance(results, dict):
+        results = [results]
+    for result in results:
+        if 'purchase_orders' in result:
+            yield from result['purchase_orders']
+        elif 'global' in result:
+            yield result
+
+
+def _objects(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _flatten(results, skip_po=None):
+    """Export rows of the POs in ``results`` as a DataFrame, plus [(po_number, row_count), ...] in row order"""
+    now = datetime.now()
+    purchase_orders = []
+    for po_result in _purchase_orders(results):
+        po_number = po_result.get('global', {}).get('PO #', 'UNKNOWN')
+        if skip_po is not None and skip_po(po_number):
+            logger.info("Skipping PO# %s as it already exists in the Excel file.", po_number)
+            continue # Skip to the next PO
+        purchase_orders.append(po_result)
+
+    if not purchase_orders:
+        return pd.DataFrame(columns=EXPORT_COLUMNS), []
+
+    # An item-less PO gets one placeholder item and a component-less item one placeholder component (None)
+    headers = [po.get('global', {}) for po in purchase_orders]
+    po_items = [po.get('items') or [None] for po in purchase_orders]
+    items = [item for entries in po_items for item in entries]
+    item_components = [(item or {}).get('Components') or [None] for item in items]
+    components = [component for entries in item_components for component in entries]
+
+    # Row layout from the counts alone: every item has >= 1 row and every PO >= 1 item
+    items_per_po = np.fromiter(map(len, po_items), dtype=np.intp, count=len(po_items))
+    rows_per_item = np.fromiter(map(len, item_components), dtype=np.intp, count=len(item_components))
+    rows_per_po = np.add.reduceat(rows_per_item, np.cumsum(items_per_po) - items_per_po)
+    po_starts = np.cumsum(rows_per_po) - rows_per_po
+    item_starts = np.cumsum(rows_per_item) - rows_per_item
+    has_item = np.fromiter((item is not None for item in items), dtype=bool, count=len(items))
+    has_comp = np.fromiter((component is not None for component in components), dtype=bool, count=len(components))
+    row_count = len(components)
+
+    def first_rows(starts, values):
+        # Blank-on-repeat: values only on the first row of their PO / item
+        column = np.full(row_count, None, dtype=object)
+        column[starts] = values if isinstance(values, str) else _objects(values)
+        return column
+
+    columns = {
+        'Extraction_Date': first_rows(po_starts, now.strftime("%Y-%m-%d")),
+        'Extraction_Time': first_rows(po_starts, now.strftime("%H:%M:%S")),
+    }
+    for field in PO_HEADER_FIELDS:
+        columns[field] = first_rows(po_starts, [header.get(field, '') for header in headers])
+    columns['PO #'] = first_rows(po_starts, [header.get('PO #', 'UNKNOWN') for header in headers])
+
+    real_items = [item for item in items if item is not None]
+    for field in ITEM_FIELDS:
+        columns[field] = first_rows(item_starts[has_item], [item.get(field, '') for item in real_items])
+    for field in ('Job #', 'Richline Item #'):
+        columns[field][item_starts[~has_item]] = 'N/A'
+
+    for field in COMPONENT_FIELDS:
+        column = _objects([(component or {}).get(field, '') for component in components])
+        column[~has_comp] = None
+        columns[field] = column
+    columns['Component'][~has_comp] = 'N/A'
+    columns['Supply Policy'][~has_comp & np.repeat(has_item, rows_per_item)] = 'N/A'
+
+    po_numbers = [str(header.get('PO #', 'UNKNOWN')) for header in headers]
+    # Kept as object columns: inferred Arrow string columns are slow to slice per PO
+    return pd.DataFrame(columns, columns=EXPORT_COLUMNS, dtype=object), list(zip(po_numbers, rows_per_po.tolist()))
+
+
+def flatten_po_frame(results, skip_po=None):
+    """Flatten POs -> items -> components into a DataFrame of export rows.
+
+    One row per component (or per component-less item / item-less PO). Columns
+    are pulled from the dicts once per PO, item and component and laid out by
+    their row counts, so no per-row dicts are built. PO header columns are only
+    filled on a PO's first row and item columns on an item's first row;
+    item-less POs and component-less items get 'N/A' placeholders. POs for
+    which ``skip_po(po_number)`` is true are left out.
+    """
+    return _flatten(results, skip_po)[0]
+
+
+def flatten_po_rows(multi_po_data, skip_po=None):
+    """Flattened export rows as a list of dicts (blank cells are None)"""
+    frame = flatten_po_frame(multi_po_data, skip_po=skip_po)
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+class POIndex:
+    """Sidecar set of PO numbers already exported to a workbook.
+
+    Stored next to the workbook as ``<workbook>.po_index``, one PO per line, so
+    recording new POs is an append and lookups are set membership tests. The
+    set stays in memory; ``reload()`` only reads the lines appended since the
+    last read.
+    """
+
+    def __init__(self, workbook_path):
+        self.workbook_path = workbook_path
+        self.path = workbook_path + ".po_index"
+        self._po_numbers = None
+        # Bytes of the index file already in _po_numbers
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._po_numbers is not None:
+            return self._po_numbers
+
+        if not os.path.exists(self.path) and (
+                os.path.exists(row_log_path(self.workbook_path)) or os.path.exists(self.workbook_path)):
+            # Exported before the index existed: build the index from the row log once
+            # (the workbook may lag behind it), or from a workbook that predates the log
+            read = read_row_log_po_numbers if os.path.exists(row_log_path(self.workbook_path)) else read_workbook_po_numbers
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.writelines(f"{po}\n" for po in sorted(read(self.workbook_path)))
+
+        self._po_numbers = set()
+        self._offset = 0
+        self._read_tail()
+        return self._po_numbers
+
+    def _read_tail(self):
+        """Add the index lines written (by any process) since the last read"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size < self._offset:
+            # Replaced by a shorter file: start over
+            self._po_numbers.clear()
+            self._offset = 0
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # A line still being written is picked up by the next read
+        end = data.rfind(b"\n") + 1
+        self._po_numbers.update(line.strip() for line in data[:end].decode("utf-8").splitlines() if line.strip())
+        self._offset += end
+
+    def reload(self):
+        """Pick up POs other processes appended to the index since it was last read"""
+        with self._lock:
+            if self._po_numbers is not None:
+                self._read_tail()
+
+    def __contains__(self, po_number):
+        with self._lock:
+            return str(po_number) in self._load()
+
+    def add_many(self, po_numbers):
+        with self._lock:
+            known = self._load()
+            new = [str(po) for po in dict.fromkeys(po_numbers) if str(po) not in known]
+            if not new:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(f"{po}\n" for po in new)
+                f.flush()
+                os.fsync(f.fileno())
+            self._read_tail()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_po_index(workbook_path):
+    """Return the in-process POIndex for a workbook, loading it on first use"""
+    workbook_path = os.path.abspath(workbook_path)
+    with _indexes_lock:
+        if workbook_path not in _indexes:
+            _indexes[workbook_path] = POIndex(workbook_path)
+        return _indexes[workbook_path]
+
+
+def read_workbook_po_numbers(workbook_path):
+    """Read the 'PO #' column of an existing workbook without loading it into pandas"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(workbook_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header or 'PO #' not in header:
+            return set()
+        po_col = header.index('PO #')
+        return {str(row[po_col]) for row in rows if row[po_col] not in (None, '')}
+    finally:
+        workbook.close()
+
+
+def read_row_log_po_numbers(workbook_path):
+    """Read the 'PO #' column of a workbook's row log"""
+    with open(row_log_path(workbook_path), newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if not header or 'PO #' not in header:
+            return set()
+        po_col = header.index('PO #')
+        return {row[po_col] for row in rows if len(row) > po_col and row[po_col]}
+
+
+def export_frame(rows, columns=EXPORT_COLUMNS):
+    """Export rows (DataFrame or list of dicts) as an object frame in column order, blanks as None"""
+    frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    frame = frame.reindex(columns=list(columns)).astype(object)
+    return frame.where(frame.notna(), None)
+
+
+def row_log_path(workbook_path):
+    """Append-only CSV of the rows exported to a workbook, kept next to it"""
+    return workbook_path + ".rows.csv"
+
+
+def _start_row_log(filename, log_path, columns):
+    """Create the row log, seeded once with the rows of a workbook written before it existed"""
+    tmp_path = f"{log_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            header = None
+            if os.path.exists(filename):
+                from openpyxl import load_workbook
+
+                workbook = load_workbook(filename, read_only=True)
+                try:
+                    rows = workbook.active.iter_rows(values_only=True)
+                    header = next(rows, None)
+                    if header and any(header):
+                        writer.writerow(["" if value is None else value for value in header])
+                        writer.writerows(["" if value is None else value for value in row] for row in rows)
+                finally:
+                    workbook.close()
+            if not header or not any(header):
+                writer.writerow(columns)
+        os.replace(tmp_path, log_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def append_rows_to_log(filename, rows, columns=EXPORT_COLUMNS):
+    """Append rows to the workbook's row log; the cost doesn't depend on how many rows it already holds.
+
+    The workbook itself is not touched, see ``build_workbook``. Callers hold the
+    workbook's FileLock.
+    """
+    log_path = row_log_path(filename)
+    if not os.path.exists(log_path):
+        _start_row_log(filename, log_path, columns)
+    with open(log_path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None) or list(columns)
+    with open(log_path, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(
+            ["" if value is None else value for value in values]
+            for values in export_frame(rows, header).itertuples(index=False, name=None))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def build_workbook(filename):
+    """(Re)write the workbook from its row log, atomically; returns the number of rows written.
+
+    The log is read up to its size when the build starts, so rows appended
+    meanwhile wait for the next build. Edits made to the workbook by hand are
+    overwritten.
+    """
+    from openpyxl import Workbook
+
+    log_path = row_log_path(filename)
+    with FileLock(filename + ".build"):
+        with FileLock(filename):
+            if not os.path.exists(log_path):
+                return 0
+            size = os.path.getsize(log_path)
+        with open(log_path, "rb") as f:
+            snapshot = f.read(size).decode("utf-8")
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        count = 0
+        for count, row in enumerate(csv.reader(io.StringIO(snapshot, newline=""))):
+            sheet.append([value if value != "" else None for value in row])
+        _save_atomic(workbook, filename)
+    return count
+
+
+def ensure_workbook(filename):
+    """Bring the workbook up to date with its row log before it is read (e.g. downloaded); returns its path"""
+    log_path = row_log_path(filename)
+    if os.path.exists(log_path) and (
+            not os.path.exists(filename) or os.path.getmtime(log_path) >= os.path.getmtime(filename)):
+        build_workbook(filename)
+    return filename
+
+
+class DebouncedWorkbookBuilds:
+    """Rebuilds workbooks from their row logs in the background, at most one pending build per workbook.
+
+    The first ``schedule()`` after a build starts a ``delay`` second timer;
+    further appends before it fires ride along with that build.
+    """
+
+    def __init__(self, delay=5.0):
+        self.delay = delay
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, filename):
+        with self._lock:
+            if filename in self._timers:
+                return
+            timer = threading.Timer(self.delay, self._build, (filename,))
+            timer.daemon = True
+            self._timers[filename] = timer
+            timer.start()
+
+    def _build(self, filename):
+        with self._lock:
+            self._timers.pop(filename, None)
+        try:
+            build_workbook(filename)
+        except Exception as e:
+            print(f"Building workbook '{filename}' failed: {e}")
+
+    def flush(self):
+        """Run every scheduled build now"""
+        with self._lock:
+            timers, self._timers = self._timers, {}
+        for filename, timer in timers.items():
+            timer.cancel()
+            self._build(filename)
+
+
+workbook_builds = DebouncedWorkbookBuilds()
+atexit.register(workbook_builds.flush)
+
+
+def _save_atomic(workbook, filename):
+    # Save next to the target and rename over it, so a crash never leaves a truncated workbook
+    tmp_path = os.path.join(os.path.dirname(filename) or ".", f".{os.path.basename(filename)}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        workbook.save(tmp_path)
+        os.replace(tmp_path, filename)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class FileLock:
+    """Cross-process lock backed by an exclusively created ``<path>.lock`` file"""
+
+    def __init__(self, path, timeout=60, stale_after=300, poll_interval=0.05):
+        self.lock_path = path + ".lock"
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                self._break_if_stale()
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not acquire {self.lock_path} within {self.timeout}s")
+                time.sleep(self.poll_interval)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _break_if_stale(self):
+        # A holder that died without cleaning up must not block exports forever
+        try:
+            if time.time() - os.path.getmtime(self.lock_path) > self.stale_after:
+                os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+
+def po_row_groups(results):
+    """Flatten results once and split the frame per PO, returning [(po_number, frame), ...]"""
+    frame, counts = _flatten(results)
+    groups = []
+    start = 0
+    for po_number, count in counts:
+        groups.append((po_number, frame.iloc[start:start + count]))
+        start += count
+    return groups
+
+
+def append_po_groups(filename, groups):
+    """Append POs not yet exported to the workbook's row log under its file lock; returns the rows written"""
+    po_index = get_po_index(filename)
+    with metrics.time_stage("export"), FileLock(filename):
+        # Another process may have exported since our index was loaded
+        po_index.reload()
+        seen = set()
+        new_frames = []
+        for po_number, rows in groups:
+            if po_number in po_index:
+                logger.info("Skipping PO# %s as it was already exported to %s.", po_number, filename)
+                continue
+            if po_number in seen:
+                logger.warning("Skipping PO# %s: it appears more than once in this export batch; "
+                               "only its first copy is written.", po_number)
+                continue
+            seen.add(po_number)
+            new_frames.append(rows)
+
+        if not new_frames:
+            return pd.DataFrame(columns=EXPORT_COLUMNS)
+        new_rows = pd.concat(new_frames, ignore_index=True)
+        append_rows_to_log(filename, new_rows)
+        po_index.add_many(seen)
+    return new_rows
+
+
+# Dataset layout: every row carries its PO header and item columns, numbers and dates are typed
+DATASET_COLUMNS = EXPORT_COLUMNS + ['Weight Unit']
+DATASET_FLOAT_COLUMNS = ['Gold Rate', 'Platinum Rate', 'Silver Rate', 'Fin Weight (Gold)', 'Tot. Weight', 'Cost ($)']
+DATASET_DATE_COLUMNS = ['Extraction_Date', 'PO Date', 'Due Date']
+NUMBER_PATTERN = r'(-?\d[\d,]*(?:\.\d+)?|-?\.\d+)'
+
+
+def dense_frame(rows):
+    """Export rows with the blanked repeats filled in: PO header columns on every row of the PO, item columns on every row of the item"""
+    frame = export_frame(rows)
+    # Every PO's first row carries the extraction date and every item's (or placeholder's) first row a Job #
+    po_ids = frame['Extraction_Date'].notna().cumsum()
+    item_ids = frame['Job #'].notna().cumsum()
+    header = ['Extraction_Date', 'Extraction_Time'] + PO_HEADER_FIELDS
+    frame[header] = frame[header].groupby(po_ids).ffill()
+    frame[ITEM_FIELDS] = frame[ITEM_FIELDS].groupby(item_ids).ffill()
+    return frame
+
+
+def dataset_frame(rows):
+    """Export rows (blank-on-repeat layout) as the dense, typed dataset frame in DATASET_COLUMNS order"""
+    frame = dense_frame(rows)
+    weights = frame['Tot. Weight'].astype("string")
+    frame['Weight Unit'] = weights.str.extract(r'([A-Za-z]+)\s*$')[0].str.upper()
+    for column in DATASET_FLOAT_COLUMNS:
+        numbers = frame[column].astype("string").str.extract(NUMBER_PATTERN)[0].str.replace(",", "", regex=False)
+        frame[column] = pd.to_numeric(numbers, errors="coerce").astype("float64")
+    for column in DATASET_DATE_COLUMNS:
+        frame[column] = pd.to_datetime(frame[column], errors="coerce", format="mixed").dt.normalize()
+    text = [column for column in DATASET_COLUMNS if column not in DATASET_FLOAT_COLUMNS + DATASET_DATE_COLUMNS]
+    frame[text] = frame[text].astype("string")
+    return frame.reindex(columns=DATASET_COLUMNS)
+
+
+class ColumnarExporter:
+    """Writes flattened export rows to a date-partitioned Parquet or CSV dataset.
+
+    Each call writes one part file under ``<root>/date=YYYY-MM-DD/``, streaming
+    rows out in batches, so the dataset can be read with pyarrow/pandas/duckdb
+    without opening any workbooks. Rows are written dense and typed (see
+    ``dataset_frame``), so totals by vendor, rate or day need no forward fill
+    or casts.
+    """
+
+    FORMATS = ("parquet", "csv")
+
+    def __init__(self, root_dir, fmt="parquet", batch_size=10_000):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}', expected one of {self.FORMATS}")
+        self.root_dir = root_dir
+        self.fmt = fmt
+        self.batch_size = batch_size
+
+    def partition_dir(self, date=None):
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        return os.path.join(self.root_dir, f"date={date}")
+
+    def write_rows(self, rows, date=None):
+        """Write export rows (DataFrame or list of dicts) as a new part file; returns its path, or None if empty"""
+        rows = dataset_frame(rows)
+        if rows.empty:
+            return None
+
+        partition = self.partition_dir(date)
+        os.makedirs(partition, exist_ok=True)
+        name = f"part-{datetime.now().strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.{self.fmt}"
+        path = os.path.join(partition, name)
+        tmp_path = os.path.join(partition, f".{name}.tmp")
+
+        if self.fmt == "parquet":
+            self._write_parquet(tmp_path, rows)
+        else:
+            self._write_csv(tmp_path, rows)
+        # Readers never see a half-written part file
+        os.replace(tmp_path, path)
+        return path
+
+    def _batches(self, rows):
+        for start in range(0, len(rows), self.batch_size):
+            yield rows.iloc[start:start + self.batch_size]
+
+    def _write_parquet(self, path, rows):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow; install it or use fmt='csv'") from e
+
+        types = {**{col: pa.float64() for col in DATASET_FLOAT_COLUMNS}, **{col: pa.date32() for col in DATASET_DATE_COLUMNS}}
+        schema = pa.schema([(col, types.get(col, pa.string())) for col in DATASET_COLUMNS])
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in self._batches(rows):
+                writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+
+    def _write_csv(self, path, rows):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            for i, batch in enumerate(self._batches(rows)):
+                batch.to_csv(f, header=(i == 0), index=False, date_format="%Y-%m-%d")
+
+
+def export_to_dataset(multi_po_data, root_dir=None, fmt=None):
+    """Export extracted POs to the columnar dataset configured by EXPORT_DATASET_DIR/FORMAT"""
+    from django.conf import settings
+
+    root_dir = root_dir or settings.EXPORT_DATASET_DIR
+    fmt = fmt or getattr(settings, "EXPORT_DATASET_FORMAT", "parquet")
+    return ColumnarExporter(root_dir, fmt=fmt).write_rows(flatten_po_frame(multi_po_data))
+
+
+### REFACTORED ###
+# This function now iterates through multiple Purchase Orders
+def export_to_excel(multi_po_data, base_filename="Daily_PO_Extracts", mode="append", output_dir=None):
+    """Export extracted data from multiple POs to a single daily Excel file on the Desktop.
+
+    ``mode="append"`` appends new rows to the row log and dedupes against the
+    sidecar PO index; the workbook is rebuilt from the log in the background
+    (``workbook_builds``), so call ``ensure_workbook()`` before reading it.
+    ``mode="rewrite"`` re-reads and rewrites the whole workbook as before.
+    """
+    filename = daily_export_path(base_filename, output_dir)
+
+    if mode == "append":
+        if append_po_groups(filename, po_row_groups(multi_po_data)).empty:
+            print("No new data to add to Excel.")
+        else:
+            workbook_builds.schedule(filename)
+        return filename, os.path.exists(filename)
+
+    try:
+        existing_df = pd.read_excel(filename) if os.path.exists(filename) else pd.DataFrame()
+    except Exception as e:
+        print(f"Warning: Could not read existing Excel file '{filename}'. Starting fresh. Error: {e}")
+        existing_df = pd.DataFrame()
+
+    def po_exists_in_file(po_number):
+        # Check if this specific PO already exists in the file
+        if not existing_df.empty and 'PO #' in existing_df.columns:
+            return existing_df['PO #'].astype(str).eq(str(po_number)).any()
+        return False
+
+    new_df = flatten_po_frame(multi_po_data, skip_po=po_exists_in_file)
+
+    if new_df.empty:
+        print("No new data to add to Excel.")
+        return filename, os.path.exists(filename)
+
+    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+    combined_df.to_excel(filename, index=False)
+
+    return filename, os.path.exists(filename)
+
+
+class WriteBehindExporter:
+    """Buffers PO rows from any thread and flushes them to the daily workbook in batches.
+
+    A background thread flushes once ``max_batch_rows`` rows are pending or the
+    oldest pending PO has waited ``max_delay`` seconds. Each flush is one locked
+    append to the workbook's row log (plus one dataset part file when a
+    ``ColumnarExporter`` is attached), so late-day flushes cost the same as the
+    first. Failed flushes are retried on the next cycle. The workbook itself is
+    rebuilt from the log when the day rolls over, ``workbook_refresh`` seconds
+    after it went stale (None = only at rollover) and on ``close()``.
+    """
+
+    def __init__(self, base_filename="Daily_PO_Extracts", output_dir=None, max_batch_rows=500,
+                 max_delay=5.0, dataset_exporter=None, workbook_refresh=300.0):
+        self.base_filename = base_filename
+        self.output_dir = output_dir
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.dataset_exporter = dataset_exporter
+        self.workbook_refresh = workbook_refresh
+        self._pending = []
+        self._pending_rows = 0
+        self._oldest = None
+        # Workbook path -> when its row log got rows the workbook doesn't have yet
+        self._stale = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="export-write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, multi_po_data):
+        """Queue an extraction result (single or multi-PO shape) for export"""
+        groups = po_row_groups(multi_po_data)
+        if not groups:
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Export service is closed")
+            self._pending.extend(groups)
+            self._pending_rows += sum(len(rows) for _, rows in groups)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._cond.notify()
+
+    def pending_rows(self):
+        with self._cond:
+            return self._pending_rows
+
+    def _due(self):
+        if not self._pending:
+            return False
+        return (self._pending_rows >= self.max_batch_rows or
+                time.monotonic() - self._oldest >= self.max_delay)
+
+    def _stale_due(self, force=False):
+        """Stale workbooks to rebuild now: past days' (rollover) and today's once workbook_refresh has passed"""
+        current = daily_export_path(self.base_filename, self.output_dir)
+        now = time.monotonic()
+        return [path for path, since in self._stale.items()
+                if force or path != current or
+                (self.workbook_refresh is not None and now - since >= self.workbook_refresh)]
+
+    def _wait_timeout(self):
+        deadlines = []
+        if self._oldest is not None:
+            deadlines.append(self._oldest + self.max_delay)
+        if self._stale and self.workbook_refresh is not None:
+            deadlines.append(min(self._stale.values()) + self.workbook_refresh)
+        return max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due() and not self._stale_due():
+                    self._cond.wait(self._wait_timeout())
+                if self._closed and not self._pending:
+                    return
+            self.flush()
+            self.refresh_workbooks()
+            if self._closed:
+                return
+
+    def flush(self):
+        """Write everything pending now; returns the number of rows written to the workbook"""
+        with self._flush_lock:
+            with self._cond:
+                groups, self._pending = self._pending, []
+                self._pending_rows = 0
+                self._oldest = None
+            if not groups:
+                return 0
+
+            filename = daily_export_path(self.base_filename, self.output_dir)
+            try:
+                written = append_po_groups(filename, groups)
+            except Exception as e:
+                print(f"Write-behind export to '{filename}' failed, will retry: {e}")
+                with self._cond:
+                    self._pending[:0] = groups
+                    self._pending_rows += sum(len(rows) for _, rows in groups)
+                    self._oldest = self._oldest or time.monotonic()
+                return 0
+
+            if not written.empty:
+                with self._cond:
+                    self._stale.setdefault(filename, time.monotonic())
+            if self.dataset_exporter is not None and not written.empty:
+                try:
+                    self.dataset_exporter.write_rows(written)
+                except Exception as e:
+                    print(f"Dataset export failed: {e}")
+            return len(written)
+
+    def refresh_workbooks(self, force=False):
+        """Rebuild the workbooks that are due (all stale ones with ``force``) from their row logs"""
+        with self._cond:
+            due = self._stale_due(force)
+            # Appends made from here on mark the workbook stale again
+            stale_since = {path: self._stale.pop(path) for path in due}
+        for path in due:
+            try:
+                build_workbook(path)
+            except Exception as e:
+                print(f"Building workbook '{path}' failed, will retry: {e}")
+                with self._cond:
+                    self._stale[path] = min(stale_since[path], self._stale.get(path, stale_since[path]))
+
+    def close(self):
+        """Flush remaining rows, stop the background thread and bring the workbooks up to date"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        self.refresh_workbooks(force=True)
+
+
+_export_service = None
+_export_service_lock = threading.Lock()
+
+
+def get_export_service():
+    """Return the process-wide write-behind exporter configured from settings"""
+    global _export_service
+    if _export_service is None:
+        with _export_service_lock:
+            if _export_service is None:
+                from django.conf import settings
+
+                dataset_exporter = None
+                if getattr(settings, "EXPORT_DATASET_ENABLED", False):
+                    dataset_exporter = ColumnarExporter(settings.EXPORT_DATASET_DIR,
+                                                        fmt=getattr(settings, "EXPORT_DATASET_FORMAT", "parquet"))
+                _export_service = WriteBehindExporter(
+                    output_dir=getattr(settings, "EXPORT_OUTPUT_DIR", None),
+                    max_batch_rows=getattr(settings, "EXPORT_BATCH_ROWS", 500),
+                    max_delay=getattr(settings, "EXPORT_FLUSH_INTERVAL", 5.0),
+                    dataset_exporter=dataset_exporter,
+                    workbook_refresh=getattr(settings, "EXPORT_WORKBOOK_REFRESH", 300.0),
+                )
+                atexit.register(_export_service.close)
+    return _export_service
+
+
+metrics.registry.gauge(
+    "extractor_export_pending_rows", "Rows queued in the write-behind exporter",
+    lambda: _export_service.pending_rows() if _export_service is not None else 0)
@@ -0,0 +1,136 @@
+# extractor/field_rois.py
+"""Learned header field positions, so global fields are read from where they sit.
+
+Learning (the ``learn_field_positions`` command): the value of each global
+field of a successful extraction is located among its header page's word
+boxes, and the normalized bounding box is merged into ``field_positions`` in
+layout_memory.json. Entries are keyed by a fingerprint of the header band
+(dHash and layout fingerprint, as in page triage).
+
+Reading: when a page's header fingerprint matches a learned layout, each
+learned field's value is the text of the page's OCR word boxes inside its
+learned box, so no extra Tesseract call is made. Values that don't look like
+the field (a date for PO Date, a number for a rate) are dropped, and the
+regex parser fills in whatever is missing.
+"""
+import re
+
+import cv2
+
+try:
+    from .page_classifier import dhash, hamming, ink_mask, layout_distance, layout_fingerprint, to_gray_array
+except ImportError:  # run directly as a script
+    from page_classifier import dhash, hamming, ink_mask, layout_distance, layout_fingerprint, to_gray_array
+
+HEADER_FRACTION = 0.3
+# Roughly a 30 DPI letter page, like the triage thumbnails
+SIGNATURE_WIDTH = 255
+# Headers of one template still differ in their field values, so allow more than page triage does
+MAX_HASH_DISTANCE = 8
+MAX_LAYOUT_DISTANCE = 6
+# Padding around a learned box when collecting its words, as a fraction of the page size
+BOX_MARGIN = 0.01
+# Learned boxes wider than this are not a single field
+MAX_FIELD_WIDTH = 0.5
+DATE = r"\d{1,2}/\d{1,2}/\d{2,4}"
+RATE = r"\d[\d,]*(?:\.\d+)?"
+# A crop's text must contain a match to be used; fields not listed are used as read
+FIELD_PATTERNS = {
+    "PO #": r"RPO\d+",
+    "PO Date": DATE,
+    "Due Date": DATE + r"|[A-Za-z]+ \d{1,2},?\s+\d{4}",
+    "Gold Rate": RATE,
+    "Silver Rate": RATE,
+    "Platinum Rate": RATE,
+}
+
+
+def header_signature(image):
+    """Fingerprint of a page's header band plus the page size: {"hash", "layout", "size": [w, h]}"""
+    gray = to_gray_array(image)
+    height, width = gray.shape
+    band = gray[:max(1, int(height * HEADER_FRACTION))]
+    small = cv2.resize(band, (SIGNATURE_WIDTH, max(1, round(band.shape[0] * SIGNATURE_WIDTH / width))),
+                       interpolation=cv2.INTER_AREA)
+    return {"hash": dhash(small), "layout": layout_fingerprint(ink_mask(small)), "size": [width, height]}
+
+
+def match_layout(signature, field_positions):
+    """Id of the closest learned layout within the thresholds, or None"""
+    best = None
+    for layout_id, entry in field_positions.items():
+        distance = hamming(signature["hash"], entry["hash"])
+        if distance > MAX_HASH_DISTANCE or layout_distance(signature["layout"], entry["layout"]) > MAX_LAYOUT_DISTANCE:
+            continue
+        if best is None or distance < best[0]:
+            best = (distance, layout_id)
+    return best[1] if best else None
+
+
+def clean_value(field, text):
+    """The part of a field's text that looks like ``field``, or "" """
+    text = " ".join(text.split())
+    pattern = FIELD_PATTERNS.get(field)
+    if pattern is None:
+        return text
+    match = re.search(pattern, text)
+    if not match:
+        return ""
+    return match.group(0).replace(",", "") if field.endswith("Rate") else match.group(0)
+
+
+def read_fields(words, fields, size):
+    """Each learned field's value from the page's word boxes whose centre is in its box; {field: value}, "" if unreadable"""
+    width, height = size
+    values = {}
+    for field, info in fields.items():
+        x0, y0, x1, y1 = info["box"]
+        inside = [
+            word["text"] for word in words
+            if x0 - BOX_MARGIN <= (word["x"] + word["width"] / 2) / width <= x1 + BOX_MARGIN
+            and y0 - BOX_MARGIN <= (word["y"] + word["height"] / 2) / height <= y1 + BOX_MARGIN
+        ]
+        values[field] = clean_value(field, " ".join(inside))
+    return values
+
+
+def _token(text):
+    return text.strip().strip(".,:;").upper()
+
+
+def locate_value(value, boxes):
+    """Pixel bounding box (x0, y0, x1, y1) of consecutive word boxes on one line spelling ``value``, or None"""
+    tokens = [_token(token) for token in str(value).split()]
+    if not tokens:
+        return None
+    for start in range(len(boxes) - len(tokens) + 1):
+        run = boxes[start:start + len(tokens)]
+        if [_token(box["text"]) for box in run] != tokens:
+            continue
+        if any(abs(box["y"] - run[0]["y"]) > run[0]["height"] for box in run):
+            continue
+        return (min(box["x"] for box in run), min(box["y"] for box in run),
+                max(box["x"] + box["width"] for box in run), max(box["y"] + box["height"] for box in run))
+    return None
+
+
+def learn_layout(field_positions, signature, field_boxes):
+    """Merge one header's field boxes (pixels) into ``field_positions``; returns the layout id"""
+    layout_id = match_layout(signature, field_positions) or signature["hash"]
+    entry = field_positions.setdefault(
+        layout_id, {"hash": signature["hash"], "layout": signature["layout"], "n": 0, "fields": {}})
+    entry["n"] += 1
+    width, height = signature["size"]
+    for field, (x0, y0, x1, y1) in field_boxes.items():
+        box = [round(x0 / width, 4), round(y0 / height, 4), round(x1 / width, 4), round(y1 / height, 4)]
+        if box[2] - box[0] > MAX_FIELD_WIDTH:
+            continue
+        known = entry["fields"].get(field)
+        if known is None:
+            entry["fields"][field] = {"box": box, "n": 1}
+        else:
+            # Values vary in length between documents: keep the union of what was seen
+            known["box"] = [min(known["box"][0], box[0]), min(known["box"][1], box[1]),
+                            max(known["box"][2], box[2]), max(known["box"][3], box[3])]
+            known["n"] += 1
+    return layout_id
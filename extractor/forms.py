@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
 
 class PDFUploadForm(forms.Form):
@@ -10,6 +11,7 @@ class PDFUploadForm(forms.Form):
 
     def clean_pdf_file(self):
         pdf = self.cleaned_data.get("pdf_file")
-        if pdf.size > 10 * 1024 * 1024:
-            raise ValidationError("Max file size is 10MB")
+        max_size = settings.PDF_UPLOAD_MAX_SIZE
+        if pdf.size > max_size:
+            raise ValidationError(f"Max file size is {max_size // (1024 * 1024)}MB")
         return pdf
@@ -0,0 +1,166 @@
+# extractor/hotfolder.py
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+
+from .admission import AdmissionRejected
+from .api import dumps_compact
+from .pool import extract_document
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _PDFEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notice(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notice(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notice(event.dest_path)
+
+
+class HotFolderWatcher:
+    """Picks up PDFs dropped into a folder, extracts them and files them under done/ or failed/.
+
+    New files are seen through watchdog (inotify and friends) when it is installed,
+    plus a periodic directory scan that is the only source when it is not. A file is
+    only processed once its size and mtime have stayed unchanged for ``settle_seconds``.
+    """
+
+    def __init__(self, watch_dir, done_dir=None, failed_dir=None, workers=2, poll_interval=5.0,
+                 settle_seconds=3.0, export=True, log=print):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.done_dir = done_dir or os.path.join(self.watch_dir, "done")
+        self.failed_dir = failed_dir or os.path.join(self.watch_dir, "failed")
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.export = export
+        self.log = log
+        self._candidates = {}
+        self._in_progress = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hot-folder")
+        self._observer = None
+
+    def notice(self, path):
+        """Record a possibly new or still-growing file"""
+        if not path.lower().endswith(".pdf") or os.path.dirname(os.path.abspath(path)) != self.watch_dir:
+            return
+        with self._lock:
+            if path not in self._in_progress:
+                self._candidates.setdefault(path, None)
+
+    def scan(self):
+        with os.scandir(self.watch_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    self.notice(entry.path)
+
+    def _ready_files(self):
+        """Candidates whose size and mtime have been stable for settle_seconds"""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, seen in list(self._candidates.items()):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    del self._candidates[path]
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if seen is None or seen[0] != signature:
+                    self._candidates[path] = (signature, now)
+                elif stat.st_size > 0 and now - seen[1] >= self.settle_seconds:
+                    del self._candidates[path]
+                    self._in_progress.add(path)
+                    ready.append(path)
+        return ready
+
+    def process(self, path):
+        try:
+            try:
+                result = extract_document(path)
+            except AdmissionRejected:
+                # Server is saturated by uploads; try again on a later tick
+                with self._lock:
+                    self._candidates[path] = None
+                return
+
+            if "error" in result:
+                self._file_away(path, self.failed_dir, result, ".error.json")
+                self.log(f"Failed: {os.path.basename(path)}: {result.get('details') or result.get('error')}")
+                return
+
+            if self.export and not getattr(settings, "EXPORT_ON_EXTRACT", False):
+                from .exporters import get_export_service
+                get_export_service().submit(result)
+            self._file_away(path, self.done_dir, result, ".json")
+            self.log(f"Extracted: {os.path.basename(path)}")
+        except Exception as e:
+            self.log(f"Error handling {path}: {e}")
+            if os.path.exists(path):
+                self._file_away(path, self.failed_dir, {"error": "Processing failed", "details": str(e)}, ".error.json")
+        finally:
+            with self._lock:
+                self._in_progress.discard(path)
+
+    def _file_away(self, path, target_dir, result, suffix):
+        os.makedirs(target_dir, exist_ok=True)
+        name = os.path.basename(path)
+        target = os.path.join(target_dir, name)
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(name)
+            target = os.path.join(target_dir, f"{stem}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}{ext}")
+        with open(os.path.splitext(target)[0] + suffix, "wb") as f:
+            f.write(dumps_compact(result))
+        shutil.move(path, target)
+
+    def run(self):
+        os.makedirs(self.watch_dir, exist_ok=True)
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_PDFEventHandler(self), self.watch_dir, recursive=False)
+            self._observer.start()
+            self.log(f"Watching {self.watch_dir} (filesystem events + {self.poll_interval}s scan)")
+        else:
+            self.log(f"Watching {self.watch_dir} (polling every {self.poll_interval}s; install watchdog for events)")
+
+        last_scan = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - last_scan >= self.poll_interval:
+                    self.scan()
+                    last_scan = time.monotonic()
+                for path in self._ready_files():
+                    self._executor.submit(self.process, path)
+                # Settling needs a fine tick even when the directory scan is infrequent
+                self._stop.wait(min(1.0, self.poll_interval, self.settle_seconds or 1.0))
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._executor.shutdown(wait=True)
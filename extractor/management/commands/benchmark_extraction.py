@@ -0,0 +1,182 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from extractor.benchmarks.synthetic import PROFILES, generate_corpus
+from extractor.extractor import HybridPDFOCRExtractor
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / "benchmarks" / "baseline.json"
+STAGES = ("rasterize", "ocr", "parse", "validate")
+# Metrics where a bigger number is worse
+LOWER_IS_BETTER = ("p50_s", "p95_s", "peak_traced_mb") + tuple(f"{stage}_mean_s" for stage in STAGES)
+
+
+def _max_rss_mb(who):
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _max_rss_mb_pair():
+    try:
+        import resource
+    except ImportError:
+        return {"self": None, "children": None}
+    return {"self": _max_rss_mb(resource.RUSAGE_SELF), "children": _max_rss_mb(resource.RUSAGE_CHILDREN)}
+
+
+class Command(BaseCommand):
+    help = "End-to-end extraction benchmark on generated Richline-style PO PDFs, compared with a stored baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+        parser.add_argument("--docs", type=int, default=3, help="Documents per profile")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--corpus-dir", help="Where to write the generated PDFs (default: a temp dir)")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+        parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+        parser.add_argument("--trace-memory", action="store_true",
+                            help="Track peak Python/numpy allocations per document with tracemalloc (slower)")
+        parser.add_argument("--json-out", help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        # Check the baseline before spending minutes on the run
+        baseline_path = Path(options["baseline"])
+        baseline = self._load_baseline(baseline_path, explicit=options["baseline"] != str(DEFAULT_BASELINE),
+                                       saving=options["save_baseline"])
+
+        corpus_dir = options["corpus_dir"] or tempfile.mkdtemp(prefix="po_bench_")
+        corpus = generate_corpus(corpus_dir, options["profiles"], options["docs"], options["seed"])
+        self.stdout.write(f"Generated {len(corpus)} documents in {corpus_dir}")
+
+        extractor = HybridPDFOCRExtractor()
+        extractor.warm_up()
+
+        runs = {}
+        for profile, path, document in corpus:
+            if options["trace_memory"]:
+                tracemalloc.start()
+            start = time.perf_counter()
+            result = extractor.extract_with_adaptive_quality(path)
+            elapsed = time.perf_counter() - start
+            peak = None
+            if options["trace_memory"]:
+                peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+
+            debug = result.get("debug", {})
+            found = result.get("purchase_orders") or ([result] if "global" in result else [])
+            runs.setdefault(profile, []).append({
+                "file": os.path.basename(path),
+                "latency_s": elapsed,
+                "pages": debug.get("page_count", len(document.pages)),
+                "timings": debug.get("timings", {}),
+                "peak_traced_mb": peak,
+                "error": result.get("error"),
+                "found_pos": len(found),
+                "expected_pos": document.expected["purchase_orders"],
+                "found_items": sum(len(po.get("items", [])) for po in found),
+                "expected_items": document.expected["items"],
+            })
+
+        report = {"profiles": {name: self._summarize(profile_runs) for name, profile_runs in runs.items()},
+                  "max_rss_mb": _max_rss_mb_pair()}
+        self._print_report(report)
+
+        if baseline is not None:
+            self._compare(report, baseline, options["tolerance"])
+        else:
+            self.stdout.write(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+
+        if options["json_out"]:
+            Path(options["json_out"]).write_text(json.dumps(report, indent=2))
+        if options["save_baseline"]:
+            baseline_path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+
+    def _summarize(self, profile_runs):
+        latencies = np.array([run["latency_s"] for run in profile_runs])
+        pages = sum(run["pages"] for run in profile_runs)
+        summary = {
+            "docs": len(profile_runs),
+            "errors": sum(1 for run in profile_runs if run["error"]),
+            "pages": pages,
+            "pages_per_s": pages / latencies.sum() if latencies.sum() else 0.0,
+            "p50_s": float(np.percentile(latencies, 50)),
+            "p95_s": float(np.percentile(latencies, 95)),
+            "po_recall": sum(min(r["found_pos"], r["expected_pos"]) for r in profile_runs) /
+                         max(1, sum(r["expected_pos"] for r in profile_runs)),
+            "item_recall": sum(min(r["found_items"], r["expected_items"]) for r in profile_runs) /
+                           max(1, sum(r["expected_items"] for r in profile_runs)),
+        }
+        for stage in STAGES:
+            summary[f"{stage}_mean_s"] = float(np.mean([run["timings"].get(stage, 0.0) for run in profile_runs]))
+        peaks = [run["peak_traced_mb"] for run in profile_runs if run["peak_traced_mb"] is not None]
+        if peaks:
+            summary["peak_traced_mb"] = max(peaks)
+        return summary
+
+    def _print_report(self, report):
+        header = f"{'profile':<10} {'docs':>4} {'err':>3} {'pages':>5} {'pages/s':>8} {'p50':>7} {'p95':>7} " + \
+                 " ".join(f"{stage[:5]:>7}" for stage in STAGES) + f" {'items':>6}"
+        self.stdout.write(header)
+        for name, s in report["profiles"].items():
+            self.stdout.write(
+                f"{name:<10} {s['docs']:>4} {s['errors']:>3} {s['pages']:>5} {s['pages_per_s']:>8.2f} "
+                f"{s['p50_s']:>7.2f} {s['p95_s']:>7.2f} " +
+                " ".join(f"{s[f'{stage}_mean_s']:>7.2f}" for stage in STAGES) + f" {s['item_recall']:>6.0%}"
+            )
+        rss = report["max_rss_mb"]
+        if rss["self"] is not None:
+            self.stdout.write(f"Peak RSS: {rss['self']:.0f} MB (this process), {rss['children']:.0f} MB (pdftoppm/tesseract)")
+
+    def _load_baseline(self, path, explicit, saving):
+        """The stored baseline report, or None when there is none (yet) or it is about to be replaced"""
+        if not path.exists():
+            if explicit and not saving:
+                raise CommandError(f"Baseline file not found: {path}")
+            return None
+        try:
+            baseline = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            if saving:
+                return None
+            raise CommandError(f"Invalid baseline file {path}: {e}")
+        if not isinstance(baseline, dict) or not isinstance(baseline.get("profiles"), dict):
+            if saving:
+                return None
+            raise CommandError(f"Invalid baseline file {path}: no per-profile results")
+        return baseline
+
+    def _compare(self, report, baseline, tolerance):
+        regressions = []
+        for name, current in report["profiles"].items():
+            previous = baseline.get("profiles", {}).get(name)
+            if not previous:
+                continue
+            for metric, value in current.items():
+                old = previous.get(metric)
+                if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                    continue
+                change = (value - old) / old
+                worse = change > tolerance if metric in LOWER_IS_BETTER else \
+                    (metric == "pages_per_s" or metric.endswith("recall")) and change < -tolerance
+                if worse:
+                    regressions.append(f"{name}.{metric}: {old:.3f} -> {value:.3f} ({change:+.0%})")
+        if regressions:
+            self.stdout.write(self.style.WARNING("Regressions against baseline:\n  " + "\n  ".join(regressions)))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {tolerance:.0%} against baseline"))
+
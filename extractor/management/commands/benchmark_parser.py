@@ -0,0 +1,91 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from extractor.benchmarks.fixtures import DEFAULT_FIXTURE_DIR, find_fixtures, load_fixture, synthetic_fixture
+from extractor.benchmarks.synthetic import PROFILES
+from extractor.extractor import HybridPDFOCRExtractor
+
+PHASES = ("split", "rpo_blocks", "format")
+
+
+class Command(BaseCommand):
+    help = "Replay recorded OCR output through the parser (split_into_rpo_blocks onward) without Tesseract or poppler"
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixtures", nargs="*", help=f"Fixture files or directories (default: {DEFAULT_FIXTURE_DIR})")
+        parser.add_argument("--synthetic", nargs="*", choices=sorted(PROFILES), metavar="PROFILE",
+                            help="Also replay generated documents for these profiles (all when given no names)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=50, help="Timed runs per fixture")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed runs per fixture")
+        parser.add_argument("--json-out", help="Also write the timings to this file")
+
+    def handle(self, *args, **options):
+        cases = [(path.name, load_fixture(path)) for path in find_fixtures(options["fixtures"] or [DEFAULT_FIXTURE_DIR])]
+        if options["synthetic"] is not None:
+            for name in options["synthetic"] or PROFILES:
+                spec = PROFILES[name]
+                spec = type(spec)(**{**spec.__dict__, "seed": options["seed"]})
+                cases.append((f"synthetic:{name}", synthetic_fixture(spec)))
+        if not cases:
+            raise CommandError("No fixtures found; record some with extract_directory --record-fixtures or pass --synthetic")
+
+        extractor = HybridPDFOCRExtractor()
+        extractor.load_layout_memory()
+
+        report = {}
+        self.stdout.write(f"{'fixture':<32} {'lines':>6} {'pos':>4} {'items':>5} {'p50 ms':>8} {'p95 ms':>8} "
+                          + " ".join(f"{phase:>10}" for phase in PHASES))
+        for name, fixture in cases:
+            for _ in range(options["warmup"]):
+                self._replay(extractor, fixture)
+            runs = [self._replay(extractor, fixture) for _ in range(max(1, options["repeat"]))]
+            totals = np.array([sum(timings.values()) for timings, _ in runs]) * 1000
+            result = runs[-1][1]
+            pos = result.get("purchase_orders") or [result]
+            summary = {
+                "lines": len(fixture["all_lines"]),
+                "purchase_orders": len(pos),
+                "items": sum(len(po.get("items", [])) for po in pos),
+                "p50_ms": float(np.percentile(totals, 50)),
+                "p95_ms": float(np.percentile(totals, 95)),
+                **{f"{phase}_mean_ms": float(np.mean([t[phase] for t, _ in runs]) * 1000) for phase in PHASES},
+            }
+            if "expected" in fixture:
+                summary["expected_items"] = fixture["expected"]["items"]
+            report[name] = summary
+            self.stdout.write(
+                f"{name[:32]:<32} {summary['lines']:>6} {summary['purchase_orders']:>4} {summary['items']:>5} "
+                f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} "
+                + " ".join(f"{summary[f'{phase}_mean_ms']:>10.3f}" for phase in PHASES)
+            )
+
+        if options["json_out"]:
+            Path(options["json_out"]).write_text(json.dumps(report, indent=2))
+
+    def _replay(self, extractor, fixture):
+        """One pass of HybridPDFOCRExtractor.parse_ocr_output, timed per phase"""
+        all_lines, text_with_coords = fixture["all_lines"], fixture["text_with_coords"]
+        debug = {"processing_steps": []}
+        timings = {}
+
+        start = time.perf_counter()
+        rpo_blocks = extractor.split_into_rpo_blocks(all_lines, debug)
+        timings["split"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processed_rpos = []
+        for rpo_block in rpo_blocks:
+            rpo_result = extractor.process_rpo_block(rpo_block, all_lines, text_with_coords, debug)
+            if rpo_result:
+                processed_rpos.append(rpo_result)
+        timings["rpo_blocks"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = extractor.format_final_result(processed_rpos, debug)
+        timings["format"] = time.perf_counter() - start
+        return timings, result
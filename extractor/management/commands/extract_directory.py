@@ -0,0 +1,131 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from extractor.api import dumps_compact
+
+_worker_extractor = None
+
+
+def _init_worker(render_threads, fixture_dir=None, force_full=False, workers=1):
+    """Build one warm extractor per worker process"""
+    global _worker_extractor
+    from extractor.pool import get_extractor
+    from extractor.scheduler import available_cores, set_scheduler_cores
+
+    # One Tesseract thread per process: the pool already runs one worker per core
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _worker_extractor = get_extractor()
+    # With EXTRACTOR_CORE_BUDGET on, each worker process budgets only its slice of the machine
+    set_scheduler_cores(available_cores() // workers)
+    # The pool already uses every core; keep pdftoppm from oversubscribing them
+    _worker_extractor.max_workers = render_threads
+    if fixture_dir:
+        _worker_extractor.fixture_dir = fixture_dir
+    if force_full:
+        _worker_extractor.classify_pages = False
+        _worker_extractor.early_termination = False
+
+
+def _extract_file(path):
+    start = time.perf_counter()
+    try:
+        result = _worker_extractor.extract_with_adaptive_quality(path)
+    except Exception as e:
+        result = {"error": "Processing failed", "details": str(e)}
+    return path, result, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Extract every PDF in a directory across a process pool, writing results as JSON Lines (resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory containing PO PDFs")
+        parser.add_argument("--output", help="JSON Lines output file (default: <directory>/extraction_results.jsonl)")
+        parser.add_argument("--checkpoint",
+                            help="Checkpoint of successfully extracted PDFs (default: <output>.checkpoint); "
+                                 "failed PDFs are retried on the next run")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+        parser.add_argument("--render-threads", type=int, default=1, help="pdftoppm threads per worker")
+        parser.add_argument("--recursive", action="store_true", help="Include PDFs in subdirectories")
+        parser.add_argument("--export", action="store_true", help="Also queue successful results for the daily Excel export")
+        parser.add_argument("--record-fixtures", metavar="DIR",
+                            help="Save each document's OCR output as a parser fixture (see benchmark_parser)")
+        parser.add_argument("--force-full", action="store_true",
+                            help="OCR every page (disable page triage and early termination)")
+        parser.add_argument("--report-every", type=int, default=25, help="Print throughput every N documents")
+
+    def handle(self, *args, **options):
+        directory = Path(options["directory"]).resolve()
+        if not directory.is_dir():
+            raise CommandError(f"Not a directory: {directory}")
+
+        output = Path(options["output"] or directory / "extraction_results.jsonl")
+        checkpoint = Path(options["checkpoint"] or f"{output}.checkpoint")
+
+        done = set()
+        if checkpoint.exists():
+            done = {line.strip() for line in checkpoint.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+        pattern = "**/*" if options["recursive"] else "*"
+        pdfs = sorted(p for p in directory.glob(pattern) if p.is_file() and p.suffix.lower() == ".pdf")
+        pending = [p for p in pdfs if str(p.relative_to(directory)) not in done]
+
+        self.stdout.write(f"{len(pdfs)} PDFs found, {len(pdfs) - len(pending)} already done, {len(pending)} to extract")
+        if not pending:
+            return
+
+        export_service = None
+        if options["export"]:
+            from extractor.exporters import get_export_service
+            export_service = get_export_service()
+
+        start = time.perf_counter()
+        finished = failed = 0
+        with open(output, "ab") as out, open(checkpoint, "a", encoding="utf-8") as ckpt, \
+                ProcessPoolExecutor(max_workers=options["workers"], initializer=_init_worker,
+                                    initargs=(options["render_threads"], options["record_fixtures"],
+                                              options["force_full"], options["workers"])) as pool:
+            futures = [pool.submit(_extract_file, str(path)) for path in pending]
+            try:
+                for future in as_completed(futures):
+                    path, result, elapsed = future.result()
+                    relative = str(Path(path).relative_to(directory))
+                    ok = "error" not in result
+                    record = {"file": relative, "status": "ok" if ok else "error", "elapsed": round(elapsed, 3), "result": result}
+
+                    # Result line first, then the checkpoint: a crash in between re-extracts, never loses.
+                    # Failures aren't checkpointed, so a re-run retries them (and appends a new line).
+                    out.write(dumps_compact(record) + b"\n")
+                    out.flush()
+                    if ok:
+                        ckpt.write(relative + "\n")
+                        ckpt.flush()
+
+                    finished += 1
+                    if not ok:
+                        failed += 1
+                        self.stderr.write(f"Failed: {relative}: {result.get('details') or result.get('error')}")
+                    elif export_service is not None:
+                        export_service.submit(result)
+
+                    if finished % options["report_every"] == 0:
+                        self._report(finished, failed, len(pending), start)
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.stderr.write("Interrupted; re-run the same command to resume")
+                raise
+
+        if export_service is not None:
+            # Flushes the remaining rows and rebuilds the workbook from its row log
+            export_service.close()
+        self._report(finished, failed, len(pending), start)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def _report(self, finished, failed, total, start):
+        elapsed = time.perf_counter() - start
+        rate = finished / elapsed * 60 if elapsed else 0.0
+        self.stdout.write(f"{finished}/{total} done ({failed} failed) in {elapsed:.1f}s - {rate:.1f} docs/min")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from extractor.extractor import HybridPDFOCRExtractor
+from extractor.page_classifier import THUMBNAIL_DPI, PageClassifier
+
+
+class Command(BaseCommand):
+    help = "Record pages of a PDF as known boilerplate (terms, cover sheets) so page triage skips them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("pdf", help="PDF containing the boilerplate pages")
+        parser.add_argument("--pages", type=int, nargs="+", required=True, help="1-based page numbers")
+        parser.add_argument("--label", default="boilerplate", help="Name shown in the triage reason")
+
+    def handle(self, *args, **options):
+        extractor = HybridPDFOCRExtractor()
+        layout_memory = extractor.load_layout_memory()
+        thumbnails = extractor.convert_pdf_to_image(options["pdf"], dpi=THUMBNAIL_DPI, use_jpeg=False)
+        if not thumbnails:
+            raise CommandError(f"Could not rasterize {options['pdf']}")
+
+        known = layout_memory.setdefault("boilerplate_pages", [])
+        classifier = PageClassifier()
+        for page in options["pages"]:
+            if not 1 <= page <= len(thumbnails):
+                raise CommandError(f"Page {page} is out of range (1-{len(thumbnails)})")
+            info = classifier.classify(thumbnails[page - 1])
+            if any(classifier.matches_boilerplate(info, entry) == 0 for entry in known):
+                self.stdout.write(f"Page {page} is already known ({info['hash']})")
+                continue
+            known.append({"hash": info["hash"], "layout": info["layout"], "ink": info["ink"],
+                          "label": options["label"]})
+            self.stdout.write(f"Learned page {page} as '{options['label']}' ({info['hash']}, layout {info['layout']})")
+
+        extractor.save_layout_memory()
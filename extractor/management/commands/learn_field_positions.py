@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from extractor.extractor import HybridPDFOCRExtractor
+
+
+class Command(BaseCommand):
+    help = "Learn where each global field sits in the PO header, so matching documents read them from there"
+
+    def add_arguments(self, parser):
+        parser.add_argument("pdfs", nargs="+", help="Correctly extracting PDFs of each header layout")
+
+    def handle(self, *args, **options):
+        extractor = HybridPDFOCRExtractor()
+        extractor.load_layout_memory()
+        extractor.learn_field_rois = True
+
+        for pdf in options["pdfs"]:
+            result = extractor.extract_with_adaptive_quality(pdf, force_full=True)
+            if "error" in result:
+                self.stderr.write(f"{pdf}: {result['error']} {result.get('details', '')}")
+                continue
+            learned = result["debug"].get("field_positions_learned", [])
+            if not learned:
+                self.stdout.write(f"{pdf}: no field positions found")
+            for entry in learned:
+                self.stdout.write(f"{pdf}: {entry['po']} -> layout {entry['layout']} ({', '.join(entry['fields'])})")
+
+        extractor.save_layout_memory()
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from extractor.hotfolder import HotFolderWatcher
+
+
+class Command(BaseCommand):
+    help = "Watch a hot folder and extract PO PDFs as they arrive, moving them to done/ or failed/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=getattr(settings, "HOT_FOLDER_DIR", None), help="Folder to watch")
+        parser.add_argument("--done-dir", default=getattr(settings, "HOT_FOLDER_DONE_DIR", None))
+        parser.add_argument("--failed-dir", default=getattr(settings, "HOT_FOLDER_FAILED_DIR", None))
+        parser.add_argument("--workers", type=int, default=getattr(settings, "HOT_FOLDER_WORKERS", 2))
+        parser.add_argument("--poll-interval", type=float, default=getattr(settings, "HOT_FOLDER_POLL_INTERVAL", 5.0))
+        parser.add_argument("--settle-seconds", type=float, default=getattr(settings, "HOT_FOLDER_SETTLE_SECONDS", 3.0),
+                            help="How long a file's size/mtime must stay unchanged before it is picked up")
+        parser.add_argument("--no-export", action="store_true", help="Don't queue results for the daily Excel export")
+
+    def handle(self, *args, **options):
+        if not options["dir"]:
+            raise CommandError("Set HOT_FOLDER_DIR or pass --dir")
+
+        watcher = HotFolderWatcher(
+            options["dir"],
+            done_dir=options["done_dir"],
+            failed_dir=options["failed_dir"],
+            workers=options["workers"],
+            poll_interval=options["poll_interval"],
+            settle_seconds=options["settle_seconds"],
+            export=not options["no_export"],
+            log=self.stdout.write,
+        )
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping hot folder watcher")
+        finally:
+            if not options["no_export"]:
+                from extractor.exporters import get_export_service
+                # Flushes the remaining rows and rebuilds the workbook from its row log
+                get_export_service().close()
@@ -0,0 +1,182 @@
+# extractor/memory.py
+"""Memory accounting and the raster memory budget.
+
+Rasterized pages dominate an extraction's footprint: a letter page at 300 DPI
+is ~25 MB as RGB (pdf2image) and ~8 MB as grayscale (PDFium). Before
+converting, ``plan_rasterization`` uses the page count and page size from the
+PDF metadata and the renderer's channel count to decide whether to render all
+pages at once, render at a lower DPI, stream one page at a time, or refuse.
+"""
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+LETTER_PTS = (612.0, 792.0)
+RGB_CHANNELS = 3
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when even one page at the lowest allowed DPI would not fit the budget"""
+
+
+def current_rss_bytes():
+    """Resident set size of this process now, or None when it can't be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss_bytes():
+    """Peak RSS of this process since it started, or None when it can't be read"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return psutil.Process().memory_info().peak_wset if psutil is not None else None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def image_nbytes(image):
+    """Decoded size of a PIL image or numpy array"""
+    if hasattr(image, "nbytes"):
+        return image.nbytes
+    return image.width * image.height * len(image.getbands())
+
+
+def page_raster_bytes(page_size_pts, dpi, channels=RGB_CHANNELS):
+    width_pt, height_pt = page_size_pts
+    return int(width_pt / 72 * dpi) * int(height_pt / 72 * dpi) * channels
+
+
+def parse_page_size(value):
+    """Points from pdfinfo's "Page size" string, e.g. "612 x 792 pts (letter)" """
+    match = re.match(r"\s*([\d.]+)\s*x\s*([\d.]+)", value or "")
+    return (float(match.group(1)), float(match.group(2))) if match else LETTER_PTS
+
+
+@dataclass
+class RasterPlan:
+    dpi: int
+    streaming: bool = False
+    estimated_bytes: int = 0
+    reason: str = ""
+
+    def as_dict(self):
+        return {"dpi": self.dpi, "streaming": self.streaming,
+                "estimated_raster_mb": round(self.estimated_bytes / MB, 1), "reason": self.reason}
+
+
+def plan_rasterization(page_count, page_size_pts, dpi, budget_bytes, min_dpi, channels=RGB_CHANNELS):
+    """Choose how to rasterize a document so decoded pages stay within ``budget_bytes``.
+
+    In order of preference: all pages at ``dpi``; all pages at a lower DPI no
+    smaller than ``min_dpi``; one page at a time at ``dpi``; one page at a time
+    at the highest DPI that fits. Raises ``MemoryBudgetExceeded`` otherwise.
+    ``channels`` is what the renderer produces (1 for grayscale, 3 for RGB).
+    """
+    per_page = page_raster_bytes(page_size_pts, dpi, channels)
+    if not budget_bytes or not page_count:
+        reason = "no budget" if not budget_bytes else "page count unavailable"
+        return RasterPlan(dpi, estimated_bytes=per_page * (page_count or 0), reason=reason)
+    if per_page * page_count <= budget_bytes:
+        return RasterPlan(dpi, estimated_bytes=per_page * page_count, reason="fits")
+
+    for lower in range(dpi - 50, min_dpi - 1, -50):
+        estimate = page_raster_bytes(page_size_pts, lower, channels) * page_count
+        if estimate <= budget_bytes:
+            return RasterPlan(lower, estimated_bytes=estimate, reason=f"downshifted from {dpi} DPI")
+
+    if per_page <= budget_bytes:
+        return RasterPlan(dpi, streaming=True, estimated_bytes=per_page, reason="streaming pages")
+    for lower in range(dpi - 50, min_dpi - 1, -50):
+        estimate = page_raster_bytes(page_size_pts, lower, channels)
+        if estimate <= budget_bytes:
+            return RasterPlan(lower, streaming=True, estimated_bytes=estimate,
+                              reason=f"streaming pages, downshifted from {dpi} DPI")
+
+    raise MemoryBudgetExceeded(
+        f"{page_count} page(s) of {page_size_pts[0]:.0f}x{page_size_pts[1]:.0f} pt need "
+        f"{page_raster_bytes(page_size_pts, min_dpi, channels) / MB:.0f} MB per page even at {min_dpi} DPI; "
+        f"budget is {budget_bytes / MB:.0f} MB"
+    )
+
+
+@dataclass
+class MemoryAccount:
+    """Per-extraction RSS samples and raster bytes held, reported in ``debug["memory"]``"""
+    budget_bytes: int = 0
+    rss_start: int = None
+    rss_peak: int = None
+    raster_held: int = 0
+    raster_peak: int = 0
+    plans: list = field(default_factory=list)
+    # Pipeline stages hold and release pages from their own threads
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.rss_start = self.rss_peak = current_rss_bytes()
+
+    def sample(self):
+        rss = current_rss_bytes()
+        if rss is not None and (self.rss_peak is None or rss > self.rss_peak):
+            self.rss_peak = rss
+
+    def hold(self, nbytes):
+        with self._lock:
+            self.raster_held += nbytes
+            self.raster_peak = max(self.raster_peak, self.raster_held)
+        self.sample()
+
+    def release(self, nbytes):
+        self.sample()
+        with self._lock:
+            self.raster_held = max(0, self.raster_held - nbytes)
+
+    def release_all(self):
+        self.release(self.raster_held)
+
+    def report(self):
+        """Memory section for the debug output (RSS figures are process-wide)"""
+        self.sample()
+        to_mb = lambda value: None if value is None else round(value / MB, 1)
+        return {
+            "budget_mb": to_mb(self.budget_bytes) if self.budget_bytes else None,
+            "raster_peak_mb": to_mb(self.raster_peak),
+            "rss_start_mb": to_mb(self.rss_start),
+            "rss_peak_mb": to_mb(self.rss_peak),
+            "process_max_rss_mb": to_mb(max_rss_bytes()),
+            "plans": self.plans,
+        }
+
+
+_current_account = ContextVar("memory_account", default=None)
+
+
+@contextmanager
+def accounting(budget_bytes=0):
+    """Make a new MemoryAccount current for the block"""
+    account = MemoryAccount(budget_bytes=budget_bytes)
+    token = _current_account.set(account)
+    try:
+        yield account
+    finally:
+        _current_account.reset(token)
+
+
+def current_account():
+    """The active MemoryAccount, or a throwaway one outside ``accounting()``"""
+    return _current_account.get() or MemoryAccount()
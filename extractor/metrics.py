@@ -0,0 +1,245 @@
+# extractor/metrics.py
+"""In-process metrics registry rendered in the Prometheus text exposition format.
+
+Metrics are per process: with several server workers, scrape each one (or
+let Prometheus sum them). Values that already live elsewhere - queue depth,
+pending export rows - are read through callbacks at scrape time.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Stage latencies range from milliseconds (parse) to minutes (OCR of a long scan)
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """A settable value, or one read from ``callback()`` at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback=None):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self._value = 0
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def value(self):
+        if self.callback is not None:
+            return self.callback()
+        with self._lock:
+            return self._value
+
+    def _samples(self):
+        try:
+            value = self.value()
+        except Exception as e:
+            print(f"Metric {self.name} callback failed: {e}")
+            return []
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value)
+
+    def totals(self, **labels):
+        """(count, sum) of everything observed for one label set"""
+        with self._lock:
+            counts, total = self._series.get(self._key(labels), ((), 0.0))
+        return sum(counts), total
+
+    def _samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, callback=None):
+        return self.register(Gauge(name, documentation, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """The whole registry in Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+documents_processed = registry.counter(
+    "extractor_documents_processed_total", "PDFs run through the extractor", ("status",))
+pages_processed = registry.counter(
+    "extractor_pages_processed_total", "PDF pages rasterized for extraction")
+purchase_orders_extracted = registry.counter(
+    "extractor_purchase_orders_total", "Purchase orders found in successful extractions")
+stage_latency = registry.histogram(
+    "extractor_stage_duration_seconds", "Time spent per pipeline stage", ("stage",))
+document_latency = registry.histogram(
+    "extractor_document_duration_seconds", "End-to-end extraction time per document")
+queue_wait = registry.histogram(
+    "extractor_queue_wait_seconds", "Time spent waiting for an extraction slot")
+pipeline_utilization = registry.histogram(
+    "extractor_pipeline_stage_utilization", "Busy fraction of each staged-pipeline stage's workers per document",
+    ("stage",), buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0))
+cache_requests = registry.counter(
+    "extractor_cache_requests_total", "Cache lookups by cache and outcome", ("cache", "result"))
+accuracy_score = registry.histogram(
+    "extractor_accuracy_score", "accuracy_score of validated extractions",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0))
+registry.gauge(
+    "extractor_accuracy_score_mean", "Mean accuracy_score since process start", lambda: mean_accuracy_score())
+registry.gauge(
+    "extractor_cache_hit_ratio", "Hit ratio of the extraction result cache since process start",
+    lambda: cache_hit_ratio("results"))
+
+
+def mean_accuracy_score():
+    count, total = accuracy_score.totals()
+    return total / count if count else None
+
+
+def cache_hit_ratio(cache):
+    hits = cache_requests.value(cache=cache, result="hit")
+    total = hits + cache_requests.value(cache=cache, result="miss")
+    return hits / total if total else None
+
+
+@contextmanager
+def time_stage(stage):
+    """Observe the time spent in the block as one ``stage`` latency sample"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_cache_lookup(cache, hit):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_extraction(result, seconds):
+    """Account one finished extraction from its result and debug section"""
+    debug = result.get("debug", {})
+    documents_processed.inc(status="error" if "error" in result else "ok")
+    pages_processed.inc(debug.get("page_count", 0))
+    document_latency.observe(seconds)
+    for stage, elapsed in debug.get("timings", {}).items():
+        stage_latency.observe(elapsed, stage=stage)
+    for stage, stats in debug.get("pipeline", {}).get("stages", {}).items():
+        pipeline_utilization.observe(stats["utilization"], stage=stage)
+
+    if "error" in result:
+        return
+    purchase_orders_extracted.inc(len(result["purchase_orders"]) if "purchase_orders" in result else 1)
+    accuracy = result.get("accuracy", {})
+    if "accuracy_score" in accuracy:
+        accuracy_score.observe(accuracy["accuracy_score"])
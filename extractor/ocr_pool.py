@@ -0,0 +1,184 @@
+# extractor/ocr_pool.py
+"""Tesseract in worker processes, with pages handed over in shared memory.
+
+Pickling a 300 DPI page to a worker would push it through a pipe (~8 MB as
+grayscale, ~25 MB as RGB) and unpickle another copy on the other side.
+Instead the page is copied once into a ``multiprocessing.shared_memory``
+block and only a ``SharedPage`` (name, shape, dtype) is sent; the worker maps
+the block as a numpy array, OCRs it and unmaps it.
+
+Lifecycle: the submitting process creates and owns every block
+(``SharedPageStore``) and unlinks it as soon as the page's OCR returns,
+fails, or its worker dies. Workers only attach and close, never unlink. If
+the owning process itself dies, multiprocessing's resource tracker unlinks
+whatever blocks it left behind.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytesseract
+
+try:
+    from . import tesseract_raw
+except ImportError:  # run directly as a script
+    import tesseract_raw
+
+# Only these columns of image_to_data are sent back (they are all the parser uses)
+BOX_KEYS = ("text", "left", "top", "width", "height")
+
+
+@dataclass(frozen=True)
+class SharedPage:
+    """What crosses the process boundary: enough to map the page, not the pixels"""
+    name: str
+    shape: tuple
+    dtype: str
+
+
+class SharedPageStore:
+    """Shared memory blocks created by this process; each one is unlinked exactly once"""
+
+    def __init__(self):
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def put(self, image):
+        """Copy a page (numpy array or PIL image) into a new block"""
+        array = np.asarray(image)
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        try:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        except BaseException:
+            block.close()
+            block.unlink()
+            raise
+        with self._lock:
+            self._blocks[block.name] = block
+        return SharedPage(block.name, array.shape, array.dtype.str)
+
+    def release(self, page):
+        with self._lock:
+            block = self._blocks.pop(page.name, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        """Unlink every block still held"""
+        with self._lock:
+            blocks, self._blocks = list(self._blocks.values()), {}
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    def __len__(self):
+        return len(self._blocks)
+
+
+def attach(name):
+    """Open an existing block without taking ownership of it.
+
+    Workers share their parent's resource tracker, so the registration this
+    adds is the owner's own entry: it is cleared when the owner unlinks.
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(tesseract_cmd):
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    # Each worker runs one Tesseract at a time and the pool is sized to the cores
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def ocr_shared_page(page, boxes=False, config="", dpi=None):
+    """Worker side: OCR a page from shared memory; returns (text, word boxes or None)"""
+    block = attach(page.name)
+    try:
+        image = np.ndarray(page.shape, dtype=np.dtype(page.dtype), buffer=block.buf)
+        data = None
+        if boxes:
+            data = tesseract_raw.image_to_data(image, config=config, dpi=dpi)
+            data = {key: data[key] for key in BOX_KEYS}
+        text = tesseract_raw.image_to_string(image, config=config, dpi=dpi)
+        del image
+        return text, data
+    finally:
+        try:
+            block.close()
+        except BufferError:
+            # A failed OCR call's traceback still references the array; the mapping
+            # goes with it, and unlinking is the owner's job either way
+            pass
+
+
+class OCRProcessPool:
+    """Process pool for Tesseract calls; safe to share between request threads"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.store = SharedPageStore()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the web server process has threads running
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(pytesseract.pytesseract.tesseract_cmd,),
+                )
+            return self._executor
+
+    def ocr(self, image, boxes=False, config="", dpi=None):
+        """OCR one page in a worker; returns (text, word boxes or None).
+
+        Raises ``BrokenProcessPool`` if the worker died; the pool is rebuilt on
+        the next call and the page's block is unlinked either way.
+        """
+        page = self.store.put(image)
+        try:
+            executor = self._get_executor()
+            try:
+                return executor.submit(ocr_shared_page, page, boxes, config, dpi).result()
+            except BrokenProcessPool:
+                self._discard(executor)
+                raise
+        finally:
+            self.store.release(page)
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.store.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_ocr_pool(workers):
+    """This process's shared OCRProcessPool with ``workers`` processes, created on first use"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = OCRProcessPool(workers)
+            atexit.register(pool.shutdown)
+        return pool
@@ -0,0 +1,110 @@
+# extractor/page_classifier.py
+"""Cheap pre-OCR page triage on low-resolution grayscale thumbnails.
+
+Each page is marked:
+
+- ``skip``: blank, or a match for known boilerplate (terms and conditions,
+  cover sheets) learned into layout_memory.json. A match needs the perceptual
+  hash, the layout fingerprint and the ink density to agree: on sparse pages
+  the hash alone is mostly noise.
+- ``header``: ink only in the top band, so only that band is OCR'd
+- ``full``: anything that may carry PO data
+"""
+import numpy as np
+from PIL import Image
+
+THUMBNAIL_DPI = 30
+SKIP, HEADER, FULL = "skip", "header", "full"
+
+
+def to_gray_array(image):
+    if isinstance(image, np.ndarray):
+        return image if image.ndim == 2 else np.asarray(Image.fromarray(image).convert("L"))
+    return np.asarray(image.convert("L"))
+
+
+def dhash(gray, size=8):
+    """64-bit difference hash of a grayscale page, as a hex string"""
+    small = np.asarray(Image.fromarray(gray).resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):0{size * size // 4}x}"
+
+
+def hamming(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def ink_mask(gray, threshold=200):
+    # Thumbnails are anti-aliased: small type renders as light grey, not black
+    return gray < threshold
+
+
+def layout_distance(layout_a, layout_b):
+    """Sum of per-band differences between two fingerprints"""
+    return sum(abs(int(a, 16) - int(b, 16)) for a, b in zip(layout_a, layout_b)) + 15 * abs(len(layout_a) - len(layout_b))
+
+
+def layout_fingerprint(mask, bands=16):
+    """Ink fraction of each horizontal band, as one hex digit per band (0 = empty, f = dense)"""
+    rows = mask.mean(axis=1)
+    parts = np.array_split(rows, bands)
+    return "".join(f"{min(15, int(part.mean() * 100)):x}" if len(part) else "0" for part in parts)
+
+
+class PageClassifier:
+    """Classifies thumbnails against thresholds and known boilerplate hashes"""
+
+    def __init__(self, boilerplate=(), blank_ink=0.0005, header_fraction=0.3, max_distance=6,
+                 max_layout_distance=4, ink_tolerance=0.25):
+        # boilerplate: [{"hash": "<hex dhash>", "layout": "<fingerprint>", "ink": 0.014, "label": "terms"}, ...]
+        self.boilerplate = list(boilerplate)
+        self.blank_ink = blank_ink
+        self.header_fraction = header_fraction
+        self.max_distance = max_distance
+        self.max_layout_distance = max_layout_distance
+        self.ink_tolerance = ink_tolerance
+
+    def matches_boilerplate(self, info, known):
+        """Distance to a known boilerplate page, or None when it isn't a match"""
+        if "layout" not in known or "ink" not in known:
+            return None
+        distance = hamming(info["hash"], known["hash"])
+        if distance > self.max_distance:
+            return None
+        if layout_distance(info["layout"], known["layout"]) > self.max_layout_distance:
+            return None
+        if abs(info["ink"] - known["ink"]) > self.ink_tolerance * max(known["ink"], self.blank_ink):
+            return None
+        return distance
+
+    def classify(self, thumbnail):
+        gray = to_gray_array(thumbnail)
+        mask = ink_mask(gray)
+        ink = float(mask.mean())
+        page_hash = dhash(gray)
+        info = {"ink": round(ink, 4), "hash": page_hash, "layout": layout_fingerprint(mask)}
+
+        if ink < self.blank_ink:
+            return {"class": SKIP, "reason": "blank", **info}
+
+        for known in self.boilerplate:
+            distance = self.matches_boilerplate(info, known)
+            if distance is not None:
+                return {"class": SKIP, "reason": f"boilerplate:{known.get('label', '')} (distance {distance})", **info}
+
+        ink_rows = np.flatnonzero(mask.mean(axis=1) > 0.01)
+        if len(ink_rows) and ink_rows[-1] < len(gray) * self.header_fraction:
+            return {"class": HEADER, "reason": "ink only in header band", **info}
+
+        return {"class": FULL, "reason": "", **info}
+
+    def classify_all(self, thumbnails):
+        return [self.classify(thumbnail) for thumbnail in thumbnails]
+
+
+def header_crop(image, header_fraction=0.3, margin=0.05):
+    """Top band of a full-resolution page for header-only OCR (a view for numpy arrays)"""
+    if isinstance(image, np.ndarray):
+        return image[:int(image.shape[0] * min(1.0, header_fraction + margin))]
+    height = int(image.height * min(1.0, header_fraction + margin))
+    return image.crop((0, 0, image.width, height))
@@ -0,0 +1,184 @@
+# extractor/pipeline.py
+"""Staged page pipeline: rasterize, preprocess and OCR overlap page by page.
+
+Stages are connected by bounded queues and each stage has its own worker
+threads, so page N+1 renders while page N is OCR'd. When a stage falls
+behind, its input queue fills and the upstream workers block
+(backpressure): no more than ``queue_size + workers`` pages wait in or
+are held by each stage, whatever the page count. Results come back in input
+order.
+
+``stats()`` reports, per stage, the time its workers spent working (busy),
+waiting for input (starved) and waiting for room downstream (blocked), and
+utilization = busy / (wall time x workers), for tuning worker counts
+against the core budget.
+"""
+import contextvars
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class Stage:
+    """``func(item)`` returns the item for the next stage, or None to drop it"""
+    name: str
+    func: object
+    workers: int = 1
+
+
+class StagedPipeline:
+    """Runs items through ``stages`` on worker threads; see ``run()``"""
+
+    def __init__(self, stages, queue_size=2):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        # _queues[i] feeds stages[i]; the last one feeds the consumer
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(len(self.stages) + 1)]
+        self._remaining = [stage.workers for stage in self.stages]
+        self._stats = {stage.name: {"items": 0, "busy": 0.0, "starved": 0.0, "blocked": 0.0} for stage in self.stages}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._threads = []
+        self._error = None
+        self._started = None
+        self._finished = None
+
+    def _get(self, inbox):
+        """Next entry from ``inbox``, or None once the pipeline is cancelled"""
+        while not self._cancelled.is_set():
+            try:
+                return inbox.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return None
+
+    def _put(self, outbox, entry):
+        """Put ``entry`` on ``outbox``, blocking while it is full; False once cancelled"""
+        while not self._cancelled.is_set():
+            try:
+                outbox.put(entry, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _add(self, name, key, value):
+        with self._lock:
+            self._stats[name][key] += value
+
+    def _feed(self, items):
+        try:
+            for seq, item in enumerate(items):
+                if not self._put(self._queues[0], (seq, item)):
+                    return
+        except BaseException as e:
+            self._fail(e)
+            return
+        self._put(self._queues[0], _DONE)
+
+    def _work(self, index, stage):
+        inbox, outbox = self._queues[index], self._queues[index + 1]
+        while True:
+            start = time.perf_counter()
+            entry = self._get(inbox)
+            self._add(stage.name, "starved", time.perf_counter() - start)
+            if entry is None:
+                return
+            if entry is _DONE:
+                # Pass the marker on to this stage's other workers; the last one out forwards it
+                self._put(inbox, _DONE)
+                with self._lock:
+                    self._remaining[index] -= 1
+                    last = self._remaining[index] == 0
+                if last:
+                    self._put(outbox, _DONE)
+                return
+
+            seq, item = entry
+            if item is not None:
+                start = time.perf_counter()
+                try:
+                    item = stage.func(item)
+                except BaseException as e:
+                    self._fail(e)
+                    return
+                self._add(stage.name, "busy", time.perf_counter() - start)
+                self._add(stage.name, "items", 1)
+
+            start = time.perf_counter()
+            if not self._put(outbox, (seq, item)):
+                return
+            self._add(stage.name, "blocked", time.perf_counter() - start)
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._cancelled.set()
+
+    def _start_thread(self, name, target, *args):
+        # Each thread gets its own copy of the caller's context (trace, memory account)
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(target, *args), name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def run(self, items):
+        """Yield ``(index, result)`` for every item in input order; ``result`` is None when a stage dropped it.
+
+        Closing the generator early (e.g. ``break``) cancels the remaining
+        work. An exception raised by a stage is re-raised here.
+        """
+        self._started = time.perf_counter()
+        self._start_thread("pipeline-feed", self._feed, items)
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                self._start_thread(f"pipeline-{stage.name}-{worker + 1}", self._work, index, stage)
+
+        pending = {}
+        next_seq = 0
+        try:
+            while True:
+                entry = self._get(self._queues[-1])
+                if entry is None or entry is _DONE:
+                    break
+                seq, result = entry
+                pending[seq] = result
+                while next_seq in pending:
+                    yield next_seq, pending.pop(next_seq)
+                    next_seq += 1
+        finally:
+            self.close()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Cancel outstanding work and wait for the worker threads to exit"""
+        self._cancelled.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        if self._finished is None and self._started is not None:
+            self._finished = time.perf_counter()
+
+    def stats(self):
+        """Per-stage worker counts, items, busy/starved/blocked seconds and utilization"""
+        wall = ((self._finished or time.perf_counter()) - self._started) if self._started else 0.0
+        stages = {}
+        with self._lock:
+            for stage in self.stages:
+                values = self._stats[stage.name]
+                stages[stage.name] = {
+                    "workers": stage.workers,
+                    "items": values["items"],
+                    "busy_s": round(values["busy"], 3),
+                    "starved_s": round(values["starved"], 3),
+                    "blocked_s": round(values["blocked"], 3),
+                    "utilization": round(values["busy"] / (wall * stage.workers), 3) if wall else 0.0,
+                }
+        return {"wall_s": round(wall, 3), "queue_size": self.queue_size, "stages": stages}
@@ -0,0 +1,115 @@
+# extractor/pool.py
+import functools
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+from . import metrics
+from .admission import get_admission_controller
+from .extractor import HybridPDFOCRExtractor
+from .profiling import run_profiled, run_traced
+from .scheduler import set_scheduler_cores
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_extractor():
+    """Return this process's shared HybridPDFOCRExtractor, creating and warming it on first use"""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                extractor = HybridPDFOCRExtractor()
+                extractor.renderer = getattr(settings, "EXTRACTOR_RENDERER", "auto")
+                extractor.ocr_processes = getattr(settings, "EXTRACTOR_OCR_PROCESSES", 0)
+                extractor.pipeline_workers = getattr(settings, "EXTRACTOR_PIPELINE_WORKERS", None)
+                extractor.pipeline_queue_size = getattr(settings, "EXTRACTOR_PIPELINE_QUEUE_SIZE", 2)
+                extractor.core_budget = getattr(settings, "EXTRACTOR_CORE_BUDGET", False)
+                extractor.table_cells = getattr(settings, "EXTRACTOR_TABLE_CELLS", False)
+                extractor.field_rois = getattr(settings, "EXTRACTOR_FIELD_ROIS", False)
+                if getattr(settings, "EXTRACTOR_CORES", None):
+                    set_scheduler_cores(settings.EXTRACTOR_CORES)
+                extractor.fixture_dir = getattr(settings, "EXTRACTOR_FIXTURE_DIR", None)
+                extractor.memory_budget_mb = getattr(settings, "EXTRACTOR_MEMORY_BUDGET_MB", None)
+                extractor.min_dpi = getattr(settings, "EXTRACTOR_MIN_DPI", extractor.min_dpi)
+                extractor.classify_pages = getattr(settings, "EXTRACTOR_CLASSIFY_PAGES", False)
+                extractor.early_termination = getattr(settings, "EXTRACTOR_EARLY_TERMINATION", False)
+                extractor.warm_up()
+                _extractor = extractor
+    return _extractor
+
+
+def warm_up_in_background():
+    """Build the shared extractor on a daemon thread so startup isn't blocked"""
+    thread = threading.Thread(target=get_extractor, name="extractor-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_on_startup():
+    """Warm up in the background if EXTRACTOR_WARM_ON_STARTUP is set.
+
+    Called from the WSGI/ASGI entry points (runserver included), so management
+    commands never start the warm-up thread.
+    """
+    if getattr(settings, "EXTRACTOR_WARM_ON_STARTUP", False):
+        return warm_up_in_background()
+    return None
+
+
+def _reset_after_fork():
+    # A child forked while another thread held the lock (e.g. mid warm-up) would
+    # inherit it locked with no thread to release it
+    global _extractor_lock
+    _extractor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def extract_document(pdf_file, profile=False, trace=False, force_full=False):
+    """Run an extraction on the shared extractor once the admission controller grants a slot.
+
+    With ``profile=True`` the run is wrapped in cProfile, and with ``trace=True`` a
+    Chrome trace of its stages, pages and parsed RPOs/items is recorded; the saved
+    artifacts are linked from ``result["debug"]``. ``force_full=True`` OCRs every
+    page (no page triage or early termination). Raises ``AdmissionRejected``
+    when the wait queue is full.
+    """
+    queued_at = time.perf_counter()
+    with get_admission_controller().admit():
+        start = time.perf_counter()
+        metrics.queue_wait.observe(start - queued_at)
+
+        extract = functools.partial(get_extractor().extract_with_adaptive_quality, force_full=force_full)
+        label = getattr(pdf_file, "name", str(pdf_file))
+        artifacts = {}
+        if trace:
+            extract = _with_artifact(run_traced, extract, label, "trace", "trace_api", artifacts)
+        if profile:
+            extract = _with_artifact(run_profiled, extract, label, "profile", "profile_api", artifacts)
+        result = extract(pdf_file)
+        if artifacts:
+            result.setdefault("debug", {}).update(artifacts)
+    metrics.record_extraction(result, time.perf_counter() - start)
+
+    if "error" not in result and getattr(settings, "EXPORT_ON_EXTRACT", False):
+        from .exporters import get_export_service
+        get_export_service().submit(result)
+    return result
+
+
+def _with_artifact(runner, func, label, key, url_name, artifacts):
+    """Wrap ``func`` in a profiling runner, collecting the artifact info under ``key``"""
+    def run(pdf_file):
+        result, info = runner(func, pdf_file, label=label)
+        if "id" in info:
+            info["url"] = reverse(url_name, args=[info["id"]])
+        artifacts[key] = info
+        return result
+    return run
@@ -0,0 +1,118 @@
+# extractor/profiling.py
+"""Opt-in cProfile capture and timeline tracing of single extractions.
+
+Each profiled run writes ``<id>.prof`` (load with pstats or snakeviz) and a
+``<id>.txt`` summary sorted by cumulative time to EXTRACTOR_PROFILE_DIR.
+Only the calling thread is profiled; Tesseract and pdftoppm show up as time
+spent waiting on their subprocesses.
+
+Traced runs write ``<id>.trace.json`` (Chrome Trace Event format, see
+``extractor.tracing``) to EXTRACTOR_TRACE_DIR.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+
+from .tracing import span, tracing
+
+# One profiler at a time: concurrent cProfile sessions skew each other's numbers
+_profile_lock = threading.Lock()
+ARTIFACT_ID_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+
+def _opt_in_requested(request, setting, param):
+    if getattr(settings, setting, False):
+        return True
+    flag = request.GET.get(param) or request.POST.get(param)
+    user = getattr(request, "user", None)
+    return flag in ("1", "true", "yes") and bool(user is not None and user.is_staff)
+
+
+def profiling_requested(request):
+    """EXTRACTOR_PROFILE turns profiling on for everyone; ?profile=1 is honoured for staff only"""
+    return _opt_in_requested(request, "EXTRACTOR_PROFILE", "profile")
+
+
+def tracing_requested(request):
+    """EXTRACTOR_TRACE turns tracing on for everyone; ?trace=1 is honoured for staff only"""
+    return _opt_in_requested(request, "EXTRACTOR_TRACE", "trace")
+
+
+def force_full_requested(request):
+    """?force_full=1 OCRs every page of the upload (no page triage or early termination)"""
+    flag = request.GET.get("force_full") or request.POST.get("force_full")
+    return flag in ("1", "true", "yes")
+
+
+def _new_artifact_id():
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def profile_dir():
+    return getattr(settings, "EXTRACTOR_PROFILE_DIR", os.path.join(settings.BASE_DIR, "profiles"))
+
+
+def trace_dir():
+    return getattr(settings, "EXTRACTOR_TRACE_DIR", os.path.join(settings.BASE_DIR, "profiles"))
+
+
+def profile_path(profile_id, suffix=".prof"):
+    """Path of a saved artifact, or None for ids that don't look like ours"""
+    if not ARTIFACT_ID_RE.match(profile_id):
+        return None
+    return os.path.join(profile_dir(), profile_id + suffix)
+
+
+def trace_path(trace_id):
+    if not ARTIFACT_ID_RE.match(trace_id):
+        return None
+    return os.path.join(trace_dir(), trace_id + ".trace.json")
+
+
+def run_profiled(func, *args, label=""):
+    """Call ``func(*args)`` under cProfile; returns (result, profile info or None)"""
+    if not _profile_lock.acquire(blocking=False):
+        return func(*args), {"skipped": "Another profiled extraction is running"}
+    try:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args)
+    finally:
+        _profile_lock.release()
+
+    profile_id = _new_artifact_id()
+    try:
+        os.makedirs(profile_dir(), exist_ok=True)
+        profiler.dump_stats(profile_path(profile_id))
+        summary = io.StringIO()
+        summary.write(f"{label}\n")
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(getattr(settings, "EXTRACTOR_PROFILE_TOP", 40))
+        with open(profile_path(profile_id, ".txt"), "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+    except OSError as e:
+        print(f"Could not save profile {profile_id}: {e}")
+        return result, {"skipped": f"Could not save profile: {e}"}
+    return result, {"id": profile_id, "total_calls": stats.total_calls, "total_seconds": round(stats.total_tt, 3)}
+
+
+def run_traced(func, *args, label=""):
+    """Call ``func(*args)`` with a Trace active; returns (result, trace info)"""
+    with tracing(label) as trace:
+        with span("extraction", category="document", document=label):
+            result = func(*args)
+
+    trace_id = _new_artifact_id()
+    try:
+        os.makedirs(trace_dir(), exist_ok=True)
+        trace.save(trace_path(trace_id))
+    except OSError as e:
+        print(f"Could not save trace {trace_id}: {e}")
+        return result, {"skipped": f"Could not save trace: {e}"}
+    return result, {"id": trace_id, "events": len(trace.events)}
@@ -0,0 +1,122 @@
+# extractor/renderers.py
+"""Pluggable PDF page renderers.
+
+``PdfiumRenderer`` renders in-process with pypdfium2 straight to 8-bit
+grayscale numpy arrays: no pdftoppm subprocess, no JPEG round trip and no
+RGB->BGR->gray conversions. The arrays share memory with the bitmap buffer
+(owned by Python), so they can be cropped, thresholded and handed to
+Tesseract without copies.
+
+``Pdf2ImageRenderer`` is the original poppler/pdf2image path and the
+fallback when pypdfium2 is not installed.
+"""
+import os
+import threading
+
+import pdf2image
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# PDFium is not thread-safe: every call into it from this process goes through this lock
+_pdfium_lock = threading.Lock()
+
+
+class RendererError(Exception):
+    """Raised when a renderer can't open or render a document"""
+
+
+class Pdf2ImageRenderer:
+    """pdftoppm via pdf2image; returns PIL images"""
+    name = "pdf2image"
+    # Decoded pages are RGB
+    channels = 3
+
+    def __init__(self, poppler_path=None, thread_count=1):
+        self.poppler_path = poppler_path
+        self.thread_count = thread_count
+
+    def render(self, pdf_file, dpi, first_page=None, last_page=None, use_jpeg=True):
+        options = {
+            "dpi": dpi,
+            "poppler_path": self.poppler_path,
+            "thread_count": self.thread_count,
+            "fmt": "jpeg" if use_jpeg else "ppm",
+            "first_page": first_page,
+            "last_page": last_page,
+        }
+        if isinstance(pdf_file, (str, os.PathLike)):
+            return pdf2image.convert_from_path(pdf_file, **options)
+        pdf_file.seek(0)
+        return pdf2image.convert_from_bytes(pdf_file.read(), **options)
+
+    def pdf_info(self, pdf_path):
+        info = pdf2image.pdfinfo_from_path(pdf_path, poppler_path=self.poppler_path)
+        return {"pages": int(info["Pages"]), "page_size": info.get("Page size")}
+
+
+class PdfiumRenderer:
+    """In-process PDFium rendering to grayscale ``uint8`` arrays of shape (height, width)"""
+    name = "pdfium"
+    channels = 1
+
+    @staticmethod
+    def available():
+        return pdfium is not None
+
+    def _open(self, pdf_file):
+        try:
+            if isinstance(pdf_file, (str, os.PathLike)):
+                return pdfium.PdfDocument(os.fspath(pdf_file))
+            pdf_file.seek(0)
+            return pdfium.PdfDocument(pdf_file.read())
+        except pdfium.PdfiumError as e:
+            raise RendererError(f"PDFium could not open the document: {e}") from e
+
+    def render(self, pdf_file, dpi, first_page=None, last_page=None, use_jpeg=True):
+        """Render pages ``first_page``..``last_page`` (1-based, inclusive); ``use_jpeg`` is ignored"""
+        with _pdfium_lock:
+            document = self._open(pdf_file)
+            try:
+                count = len(document)
+                first = max(1, first_page or 1)
+                last = min(count, last_page or count)
+                pages = []
+                for index in range(first - 1, last):
+                    page = document[index]
+                    try:
+                        bitmap = page.render(scale=dpi / 72, grayscale=True)
+                        pages.append(bitmap.to_numpy())
+                    finally:
+                        page.close()
+                return pages
+            finally:
+                document.close()
+
+    def pdf_info(self, pdf_path):
+        with _pdfium_lock:
+            document = self._open(pdf_path)
+            try:
+                width, height = document[0].get_size() if len(document) else (612.0, 792.0)
+                return {"pages": len(document), "page_size": f"{width:g} x {height:g} pts"}
+            finally:
+                document.close()
+
+
+RENDERERS = {"pdfium": PdfiumRenderer, "pdf2image": Pdf2ImageRenderer}
+
+
+def get_renderer(name="auto", poppler_path=None, thread_count=1):
+    """The renderer called ``name``; "auto" prefers PDFium when pypdfium2 is installed"""
+    if name == "auto":
+        name = "pdfium" if PdfiumRenderer.available() else "pdf2image"
+    if name == "pdfium":
+        if not PdfiumRenderer.available():
+            print("pypdfium2 is not installed; falling back to pdf2image")
+            return Pdf2ImageRenderer(poppler_path, thread_count)
+        return PdfiumRenderer()
+    if name == "pdf2image":
+        return Pdf2ImageRenderer(poppler_path, thread_count)
+    raise ValueError(f"Unknown renderer '{name}' (expected one of: auto, {', '.join(RENDERERS)})")
@@ -0,0 +1,111 @@
+# extractor/scheduler.py
+"""Core budget for concurrent extractions.
+
+Left alone, each document renders with ``max_workers`` pdftoppm threads,
+Tesseract starts one OpenMP thread per core for every call, and the OCR pool
+and pipeline add their own workers - with a few uploads in flight that is
+several times more runnable threads than cores, and throughput collapses into
+context switching. The ``CoreScheduler`` tracks the documents in flight and
+gives each an equal share of the cores; the share is read live, so it shrinks
+as uploads arrive and grows back as they finish.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+# Tesseract's OpenMP speedup flattens out past a few threads; beyond this,
+# cores are better spent on other pages
+TESSERACT_MAX_THREADS = 4
+
+
+def available_cores():
+    """Cores this process may run on, honouring CPU affinity and a cgroup v2 CPU quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows, macOS
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+@dataclass(frozen=True)
+class CoreBudget:
+    """One document's share of the cores"""
+    cores: int
+    in_flight: int
+    render_threads: int
+    ocr_workers: int
+    tesseract_threads: int
+
+    def as_dict(self):
+        return asdict(self)
+
+
+class CoreScheduler:
+    """Splits ``cores`` between the documents being extracted"""
+
+    def __init__(self, cores=None):
+        self.cores = cores or available_cores()
+        self.in_flight = 0
+        self.pipelined = 0
+        self._lock = threading.Lock()
+
+    def budget(self):
+        """The current per-document share"""
+        with self._lock:
+            in_flight, pipelined = max(1, self.in_flight), self.pipelined
+        share = max(1, self.cores // in_flight)
+        # One Tesseract per document at a time can use a few OpenMP threads; once
+        # documents (or pipelined pages) OCR concurrently, page-level parallelism wins
+        tesseract_threads = 1 if in_flight > 1 or pipelined else min(share, TESSERACT_MAX_THREADS)
+        return CoreBudget(self.cores, in_flight, render_threads=share, ocr_workers=share,
+                          tesseract_threads=tesseract_threads)
+
+    @contextmanager
+    def document(self, pipelined=False):
+        """Count a document in flight for the block; ``current_budget()`` reads its share inside it"""
+        with self._lock:
+            self.in_flight += 1
+            self.pipelined += bool(pipelined)
+        token = _current_scheduler.set(self)
+        try:
+            yield self
+        finally:
+            _current_scheduler.reset(token)
+            with self._lock:
+                self.in_flight -= 1
+                self.pipelined -= bool(pipelined)
+
+
+_current_scheduler = ContextVar("core_scheduler", default=None)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """This process's CoreScheduler, created on first use"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = CoreScheduler()
+    return _scheduler
+
+
+def set_scheduler_cores(cores):
+    """Override the detected core count (e.g. a share of the machine per worker process)"""
+    get_scheduler().cores = max(1, cores)
+
+
+def current_budget():
+    """This extraction's core share, or None outside ``CoreScheduler.document()``"""
+    scheduler = _current_scheduler.get()
+    return scheduler.budget() if scheduler is not None else None
@@ -0,0 +1,174 @@
+# extractor/table_detector.py
+"""Ruling-line table detection for the component table.
+
+The component table ("Supplied by / Component / Setting / Cost / Tot. Weight")
+is drawn with ruling lines. ``find_tables`` recovers each ruled table's cell
+grid by morphologically extracting the long horizontal and vertical strokes.
+``read_component_tables`` needs no OCR of its own: it drops the word boxes
+of the page's full OCR pass into the grid's cells by their centres, so
+values come out already assigned to their columns. Numeric cells get the
+usual OCR confusions mapped (O->0, l/I->1, S->5, B->8); a cell that still
+doesn't look like its column is kept as read rather than trimmed. Columns whose header can't be read are
+labelled from the learned ``component_bands`` in layout_memory.json.
+"""
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+try:
+    from .page_classifier import to_gray_array
+except ImportError:  # run directly as a script
+    from page_classifier import to_gray_array
+
+# Output field -> header keywords, in matching order
+COLUMN_KEYWORDS = (
+    ("Component", ("component",)),
+    ("Cost ($)", ("cost",)),
+    ("Tot. Weight", ("weight",)),
+    ("Supply Policy", ("policy", "supplied")),
+)
+# What a cleaned cell must look like; cells that don't match are kept as read
+CELL_PATTERNS = {
+    "Component": re.compile(r"[A-Z0-9][A-Z0-9/.-]*"),
+    "Cost ($)": re.compile(r"\d+(?:\.\d+)?"),
+    "Tot. Weight": re.compile(r"\d*\.?\d+(?: (?:CT|GR|PC|EA))?"),
+}
+# Letters OCR reads in place of digits
+DIGIT_CONFUSIONS = str.maketrans({"O": "0", "o": "0", "l": "1", "I": "1", "S": "5", "B": "8"})
+WEIGHT_UNITS = ("CT", "GR", "PC", "EA")
+# Ruling lines read as words of their own
+RULE_MARKS = re.compile(r"[|\[\]!]+")
+
+
+@dataclass
+class TableGrid:
+    """Ruling-line positions of one table, in page pixels"""
+    rows: list
+    cols: list
+
+    @property
+    def top(self):
+        return self.rows[0]
+
+    @property
+    def bottom(self):
+        return self.rows[-1]
+
+
+def _line_positions(profile, min_fill=0.5):
+    """Centres of the runs in a projection profile that are at least ``min_fill`` full"""
+    hits = np.flatnonzero(profile >= min_fill)
+    if not len(hits):
+        return []
+    runs = np.split(hits, np.flatnonzero(np.diff(hits) > 1) + 1)
+    return [int(run.mean()) for run in runs]
+
+
+def find_tables(gray, min_rows=2, min_cols=2):
+    """Cell grids of the ruled tables on a grayscale page, top to bottom"""
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    height, width = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(10, width // 30), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(10, height // 100))))
+
+    grids = []
+    contours, _ = cv2.findContours(cv2.bitwise_or(horizontal, vertical), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < width // 4 or h < 10:
+            continue
+        rows = _line_positions(horizontal[y:y + h, x:x + w].mean(axis=1) / 255)
+        cols = _line_positions(vertical[y:y + h, x:x + w].mean(axis=0) / 255)
+        if len(rows) < min_rows + 1 or len(cols) < min_cols + 1:
+            continue
+        grids.append(TableGrid([y + row for row in rows], [x + col for col in cols]))
+    return sorted(grids, key=lambda grid: grid.top)
+
+
+def cell_words(grid, words):
+    """Text of each cell of ``grid`` as {(row, col): text}, from word boxes (x, y, width, height) on the page"""
+    cells = {}
+    for word in words:
+        x = word["x"] + word["width"] / 2
+        y = word["y"] + word["height"] / 2
+        row, col = bisect_right(grid.rows, y) - 1, bisect_right(grid.cols, x) - 1
+        if 0 <= row < len(grid.rows) - 1 and 0 <= col < len(grid.cols) - 1:
+            cells.setdefault((row, col), []).append(word["text"])
+    return {cell: " ".join(texts) for cell, texts in cells.items()}
+
+
+def clean_cell(field, text):
+    """A cell's value for its column; as read (minus ruling lines) when it doesn't fit the column"""
+    words = [word for word in text.split() if not RULE_MARKS.fullmatch(word)]
+    raw = " ".join(words)
+    if field == "Component":
+        value = raw.upper()
+    elif field == "Cost ($)":
+        value = raw.translate(DIGIT_CONFUSIONS).replace("$", "").replace(",", "").replace(" ", "")
+    elif field == "Tot. Weight":
+        unit = [words.pop()] if words and words[-1].upper() in WEIGHT_UNITS else []
+        value = " ".join(["".join(words).translate(DIGIT_CONFUSIONS)] + [word.upper() for word in unit]).strip()
+    else:
+        return raw
+    return value if CELL_PATTERNS[field].fullmatch(value) else raw
+
+
+def label_columns(headers, cols, page_width, bands=None):
+    """Output field for each grid column (None for columns we don't keep, e.g. Setting)"""
+    labels = [None] * len(headers)
+    for field, keywords in COLUMN_KEYWORDS:
+        matches = (index for keyword in keywords for index, header in enumerate(headers)
+                   if labels[index] is None and keyword in header.lower())
+        index = next(matches, None)
+        if index is not None:
+            labels[index] = field
+
+    # Fill unreadable headers from the learned column bands (normalized x ranges)
+    for index, label in enumerate(labels):
+        if label is not None or not bands:
+            continue
+        left, right = cols[index] / page_width, cols[index + 1] / page_width
+        overlaps = {
+            field: min(right, band["x_max"]) - max(left, band["x_min"])
+            for field, band in bands.items() if field not in labels
+        }
+        field = max(overlaps, key=overlaps.get, default=None)
+        if field is not None and overlaps[field] > 0.5 * (right - left):
+            labels[index] = field
+    return labels
+
+
+def read_component_table(grid, words, page_width, bands=None):
+    """Components of one grid if it is a component table, else None"""
+    rows, cols = grid.rows, grid.cols
+    cells = cell_words(grid, words)
+    headers = [cells.get((0, col), "") for col in range(len(cols) - 1)]
+    if not any("component" in header.lower() or "supplied" in header.lower() for header in headers):
+        return None
+    labels = label_columns(headers, cols, page_width, bands)
+    if "Component" not in labels:
+        return None
+
+    components = []
+    for row in range(1, len(rows) - 1):
+        component = {"Component": "", "Cost ($)": "", "Tot. Weight": "", "Supply Policy": ""}
+        for col, field in enumerate(labels):
+            if field is not None:
+                component[field] = clean_cell(field, cells.get((row, col), ""))
+        if component["Component"]:
+            components.append(component)
+    return {"top": grid.top, "bottom": grid.bottom, "columns": labels, "components": components}
+
+
+def read_component_tables(image, words, bands=None):
+    """Every component table on a full-resolution page (numpy array or PIL image), read from its OCR word boxes"""
+    gray = to_gray_array(image)
+    tables = []
+    for grid in find_tables(gray):
+        table = read_component_table(grid, words, gray.shape[1], bands)
+        if table is not None:
+            tables.append(table)
+    return tables
@@ -0,0 +1,121 @@
+# extractor/tesseract_raw.py
+"""Tesseract calls that stream the raw page over stdin.
+
+pytesseract saves every image to a temporary PNG and passes the path, so a
+page that is already a grayscale or binarized numpy array is PNG-encoded,
+written, read back and decoded per call. Here the array goes to
+``tesseract stdin stdout`` as an uncompressed PGM (PPM for RGB), which is
+a short text header in front of the pixel buffer, with no encoding and no
+temp files. Output is read from stdout. A PGM carries no resolution, so the
+render DPI is passed as ``--dpi`` (pytesseract got it from the PNG it wrote);
+without it Tesseract warns and estimates the resolution on every call.
+``threads`` sets ``OMP_THREAD_LIMIT`` for that one Tesseract process, so
+concurrent extractions can each run with their own core share.
+
+The functions mirror ``pytesseract.image_to_string`` and
+``pytesseract.image_to_data(output_type=DICT)``. If the stdin path fails
+where pytesseract works (an old or unusual Tesseract build), the process
+switches to pytesseract for the rest of its life.
+"""
+import os
+import shlex
+import subprocess
+
+import numpy as np
+import pytesseract
+
+_raw_supported = True
+
+
+def netpbm_bytes(image):
+    """Binary PGM (grayscale) or PPM (RGB) encoding of a numpy array or PIL image"""
+    if not isinstance(image, np.ndarray):
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB" if image.mode in ("RGBA", "CMYK", "P") else "L")
+        image = np.asarray(image)
+    if image.dtype != np.uint8:
+        raise ValueError(f"Expected an 8-bit image, got {image.dtype}")
+    if image.ndim == 2:
+        magic = b"P5"
+    elif image.ndim == 3 and image.shape[2] == 3:
+        magic = b"P6"
+    else:
+        raise ValueError(f"Unsupported image shape {image.shape}")
+    height, width = image.shape[:2]
+    return b"%s\n%d %d\n255\n" % (magic, width, height) + np.ascontiguousarray(image).tobytes()
+
+
+def image_dpi(image):
+    """Resolution recorded on a PIL image, or None (numpy arrays carry none)"""
+    dpi = getattr(image, "info", {}).get("dpi")
+    return round(dpi[0]) if dpi else None
+
+
+def dpi_config(config, dpi):
+    """``config`` with ``--dpi`` added when the resolution is known and not already set"""
+    if not dpi or "--dpi" in config:
+        return config
+    return f"{config} --dpi {int(dpi)}".strip()
+
+
+def _run(image, config, configfile=None, threads=None):
+    args = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout", *shlex.split(config)]
+    if configfile:
+        args.append(configfile)
+    env = {**os.environ, "OMP_THREAD_LIMIT": str(threads)} if threads else None
+    proc = subprocess.run(args, input=netpbm_bytes(image), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          env=env)
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", "replace").strip())
+    return proc.stdout.decode("utf-8")
+
+
+def _parse_tsv(text):
+    """image_to_data's DICT shape: one list per column, numbers converted"""
+    lines = text.splitlines()
+    if not lines:
+        return {}
+    columns = lines[0].split("\t")
+    data = {column: [] for column in columns}
+    for line in lines[1:]:
+        cells = line.split("\t")
+        cells += [""] * (len(columns) - len(cells))
+        for column, cell in zip(columns, cells):
+            if column != "text":
+                try:
+                    cell = int(cell)
+                except ValueError:
+                    cell = float(cell) if cell else -1
+            data[column].append(cell)
+    return data
+
+
+def _with_fallback(raw_call, fallback_call):
+    global _raw_supported
+    if not _raw_supported:
+        return fallback_call()
+    try:
+        return raw_call()
+    except Exception as e:
+        raw_error = e
+    result = fallback_call()
+    # pytesseract managed the same call, so the stdin path itself doesn't work here
+    _raw_supported = False
+    print(f"Tesseract stdin input failed ({raw_error}); using pytesseract temp files from now on")
+    return result
+
+
+def image_to_string(image, config="", dpi=None, threads=None):
+    config = dpi_config(config, dpi or image_dpi(image))
+    return _with_fallback(
+        lambda: _run(image, config, threads=threads),
+        lambda: pytesseract.image_to_string(image, config=config),
+    )
+
+
+def image_to_data(image, config="", dpi=None, threads=None):
+    config = dpi_config(config, dpi or image_dpi(image))
+    return _with_fallback(
+        lambda: _parse_tsv(_run(image, config, "tsv", threads)),
+        lambda: pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT),
+    )
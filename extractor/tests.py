@@ -1,3 +1,878 @@
-from django.test import TestCase
+import io
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from . import api, exporters, pool, tesseract_raw
+from .admission import AdmissionController, AdmissionRejected
+from .benchmarks.synthetic import TERMS_LINES, POSpec, generate_document, write_text_pdf
+from .cache import ResultFileCache
+from .extractor import WARM_UP_LINES, HybridPDFOCRExtractor
+from .field_rois import header_signature
+from .memory import MB, MemoryBudgetExceeded, plan_rasterization
+from .metrics import MetricsRegistry
+from .ocr_pool import OCRProcessPool
+from .pipeline import Stage, StagedPipeline
+from .renderers import PdfiumRenderer
+from .scheduler import CoreScheduler, current_budget
+from .table_detector import clean_cell, read_component_tables
+from .tracing import tracing
+
+SAMPLE_RESULT = {
+    "purchase_orders": [
+        {"po_number": "RPO900001", "global": {"PO #": "RPO900001"}, "items": [], "item_count": 0, "component_count": 0},
+    ],
+    "summary": {"total_pos": 1, "total_items": 0, "total_components": 0},
+}
+
+
+def sample_po(number, items=1, components=2):
+    """A multi-PO result entry with ``items`` items of ``components`` components each"""
+    return {
+        "po_number": f"RPO{number}",
+        "global": {"PO #": f"RPO{number}", "Location": "NYC", "Gold Rate": "2400.00"},
+        "items": [
+            {
+                "Richline Item #": f"AB1234X{number}{i}", "Job #": f"RFP{number}{i}", "Vendor Item #": "VI1",
+                "Components": [{"Component": f"CS{j}", "Cost ($)": "1.50", "Tot. Weight": "0.1",
+                                "Supply Policy": "By Vendor"} for j in range(components)],
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def read_sheet(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def loop_flatten(purchase_orders):
+    """The row-by-row flatten that flatten_po_frame replaced, kept as the reference"""
+    rows = []
+    for po in purchase_orders:
+        global_data = po.get("global", {})
+        header = {field: global_data.get(field, "") for field in exporters.PO_HEADER_FIELDS}
+        header.update({"PO #": global_data.get("PO #", "UNKNOWN"), "Extraction_Date": "date", "Extraction_Time": "time"})
+        if not po.get("items", []):
+            rows.append({**header, "Job #": "N/A", "Richline Item #": "N/A", "Component": "N/A"})
+            continue
+        for item_idx, item in enumerate(po["items"]):
+            item_data = {field: item.get(field, "") for field in exporters.ITEM_FIELDS}
+            components = item.get("Components", [])
+            if not components:
+                rows.append({**item_data, **(header if item_idx == 0 else {}), "Component": "N/A", "Supply Policy": "N/A"})
+                continue
+            for comp_idx, component in enumerate(components):
+                row = {**item_data, **(header if item_idx == 0 else {})} if comp_idx == 0 else {}
+                row.update({field: component.get(field, "") for field in exporters.COMPONENT_FIELDS})
+                rows.append(row)
+    return [{column: row.get(column) for column in exporters.EXPORT_COLUMNS} for row in rows]
+
+
+def fake_tesseract(page_text):
+    """Patches for tesseract_raw that "read" ``page_text(image)`` off every image, with one box per word"""
+    def image_to_string(image, config="", dpi=None, threads=None):
+        return page_text(image)
+
+    def image_to_data(image, config="", dpi=None, threads=None):
+        words = [(row, word) for row, line in enumerate(page_text(image).splitlines()) for word in line.split()]
+        return {"text": [word for _, word in words], "left": [10 * i for i in range(len(words))],
+                "top": [20 * row for row, _ in words], "width": [40] * len(words), "height": [12] * len(words)}
+
+    return (mock.patch("extractor.tesseract_raw.image_to_string", side_effect=image_to_string),
+            mock.patch("extractor.tesseract_raw.image_to_data", side_effect=image_to_data))
+
+
+class ExtractorTestCase(SimpleTestCase):
+    """Runs the extractor on synthetic text PDFs with Tesseract replaced by ``fake_tesseract``"""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.extractor = HybridPDFOCRExtractor()
+        self.extractor.renderer = "pdfium"
+
+    def write_pdf(self, pages):
+        path = os.path.join(self.dir, f"doc{len(os.listdir(self.dir))}.pdf")
+        write_text_pdf(path, pages)
+        return path
+
+    def ocr(self, page_text):
+        for patch in fake_tesseract(page_text):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+
+class ExtractionApiTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        caches = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "results": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": self.cache_dir},
+        }
+        settings = override_settings(CACHES=caches, EXTRACTION_RESULT_CACHE="results")
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, size=100):
+        return SimpleUploadedFile("po.pdf", b"%PDF" + b"0" * (size - 4), content_type="application/pdf")
+
+    @mock.patch("extractor.api.extract_document", return_value=SAMPLE_RESULT)
+    def test_result_is_readable_from_another_process(self, extract_document):
+        response = self.client.post(reverse("extract_api"), {"pdf_file": self.upload()})
+        self.assertEqual(response.status_code, 200)
+        result_id = response.json()["result_id"]
+
+        # A second FileBasedCache on the same directory stands in for another worker process
+        other_worker = FileBasedCache(self.cache_dir, {})
+        record = other_worker.get(api.RESULT_CACHE_PREFIX + result_id)
+        self.assertEqual(record["result"], SAMPLE_RESULT)
+
+        response = self.client.get(reverse("extraction_result_api", args=[result_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["purchase_orders"][0]["po_number"], "RPO900001")
+
+    @override_settings(PDF_UPLOAD_MAX_SIZE=1024)
+    @mock.patch("extractor.api.extract_document", return_value=SAMPLE_RESULT)
+    def test_oversized_upload_is_refused(self, extract_document):
+        response = self.client.post(reverse("extract_api"), {"pdf_file": self.upload(size=2048)})
+        self.assertEqual(response.status_code, 413)
+        extract_document.assert_not_called()
+
+
+class ExtractorPoolTests(SimpleTestCase):
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_forked_child_does_not_inherit_a_held_extractor_lock(self):
+        with pool._extractor_lock:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(0 if pool._extractor_lock.acquire(timeout=2) else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def hold_slot(self, controller):
+        """Occupy one slot on another thread until the returned event is set"""
+        admitted, release = threading.Event(), threading.Event()
+
+        def run():
+            with controller.admit():
+                admitted.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.assertTrue(admitted.wait(5))
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        return release
+
+    def test_rejects_when_the_queue_is_full(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=0, retry_after=7)
+        self.hold_slot(controller)
+        with self.assertRaises(AdmissionRejected) as raised:
+            with controller.admit():
+                pass
+        self.assertEqual(raised.exception.retry_after, 7)
+        self.assertEqual(controller.stats()["rejected"], 1)
+
+    def test_waiting_request_times_out(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        self.hold_slot(controller)
+        with self.assertRaisesMessage(AdmissionRejected, "Timed out"):
+            with controller.admit():
+                pass
+        self.assertEqual(controller.stats()["queue_depth"], 0)
+
+    def test_waiting_request_runs_once_a_slot_frees(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        release = self.hold_slot(controller)
+        threading.Timer(0.05, release.set).start()
+        with controller.admit():
+            self.assertEqual(controller.stats()["active"], 1)
+
+    def test_api_answers_503_with_retry_after(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=0, retry_after=12)
+        self.hold_slot(controller)
+        upload = SimpleUploadedFile("po.pdf", b"%PDF-1.4", content_type="application/pdf")
+        with mock.patch("extractor.pool.get_admission_controller", return_value=controller):
+            response = self.client.post(reverse("extract_api"), {"pdf_file": upload})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "12")
+
+
+class WorkbookExportTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.workbook = os.path.join(self.dir, "Daily_PO_Extracts_2025-01-01.xlsx")
+        exporters._indexes.clear()
+
+    def append(self, *pos):
+        return exporters.append_po_groups(self.workbook, exporters.po_row_groups({"purchase_orders": list(pos)}))
+
+    def test_appends_go_to_the_row_log_without_touching_the_workbook(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        workbook.active.append(exporters.EXPORT_COLUMNS)
+        workbook.active.append(["2025-01-01", "09:00:00", "RPO1"] + [None] * (len(exporters.EXPORT_COLUMNS) - 3))
+        workbook.save(self.workbook)
+        self.append(sample_po(2))  # seeds the log from the workbook once
+        mtime = os.path.getmtime(self.workbook)
+
+        with mock.patch("openpyxl.load_workbook", side_effect=AssertionError("workbook was loaded")):
+            self.append(sample_po(3))
+            self.append(sample_po(1))  # already in the workbook
+        self.assertEqual(os.path.getmtime(self.workbook), mtime)
+
+        self.assertEqual(exporters.build_workbook(self.workbook), 5)
+        rows = read_sheet(self.workbook)
+        self.assertEqual(list(rows[0]), exporters.EXPORT_COLUMNS)
+        self.assertEqual([row[2] for row in rows[1:] if row[2]], ["RPO1", "RPO2", "RPO3"])
+
+    def test_index_reload_reads_only_what_other_processes_appended(self):
+        self.append(sample_po(1))
+        index = exporters.get_po_index(self.workbook)
+        with open(index.path, "a", encoding="utf-8") as f:
+            f.write("RPO9\nRPO1")  # another process, mid-write on its second line
+        offset = index._offset
+        index.reload()
+        self.assertIn("RPO9", index)
+        self.assertEqual(index._offset, offset + len("RPO9\n"))
+
+        with open(index.path, "a", encoding="utf-8") as f:
+            f.write("0\n")
+        index.reload()
+        self.assertIn("RPO10", index)
+        with mock.patch("builtins.open", side_effect=AssertionError("index was re-read")):
+            index.reload()
+
+    def test_append_export_defers_the_workbook_build(self):
+        builds = exporters.DebouncedWorkbookBuilds(delay=60)
+        with mock.patch.object(exporters, "workbook_builds", builds), \
+                mock.patch.object(exporters, "build_workbook", wraps=exporters.build_workbook) as build:
+            path, _ = exporters.export_to_excel({"purchase_orders": [sample_po(1)]}, output_dir=self.dir)
+            exporters.export_to_excel({"purchase_orders": [sample_po(2)]}, output_dir=self.dir)
+            build.assert_not_called()
+            builds.flush()
+            self.assertEqual(build.call_count, 1)
+        self.assertEqual([row[2] for row in read_sheet(path)[1:] if row[2]], ["RPO1", "RPO2"])
+
+    def test_ensure_workbook_builds_only_when_the_log_is_newer(self):
+        self.append(sample_po(1))
+        with mock.patch.object(exporters, "build_workbook", wraps=exporters.build_workbook) as build:
+            exporters.ensure_workbook(self.workbook)
+            os.utime(self.workbook, (time.time() + 10, time.time() + 10))
+            exporters.ensure_workbook(self.workbook)
+        self.assertEqual(build.call_count, 1)
+
+    def test_write_behind_close_builds_the_workbook(self):
+        service = exporters.WriteBehindExporter(output_dir=self.dir, max_delay=60, workbook_refresh=None)
+        service.submit({"purchase_orders": [sample_po(1), sample_po(2)]})
+        service.close()
+        path = exporters.daily_export_path(output_dir=self.dir)
+        self.assertEqual(len(read_sheet(path)), 1 + 4)
+
+    def test_duplicates_are_logged_by_cause(self):
+        self.append(sample_po(1))
+        with self.assertLogs("pdf_extractor", level="INFO") as logs:
+            written = self.append(sample_po(1), sample_po(2), sample_po(2))
+        self.assertEqual(set(written["PO #"].dropna()), {"RPO2"})
+        self.assertIn("RPO1 as it was already exported", logs.output[0])
+        self.assertIn("RPO2: it appears more than once in this export batch", logs.output[1])
+
+    def test_write_behind_loses_no_rows_under_concurrency(self):
+        service = exporters.WriteBehindExporter(output_dir=self.dir, max_batch_rows=7, max_delay=0.01,
+                                                workbook_refresh=None)
+        threads, per_thread = 8, 25
+
+        def submit(thread):
+            for n in range(per_thread):
+                service.submit({"purchase_orders": [sample_po(thread * 1000 + n)]})
+                if n % 10 == 0:
+                    service.flush()
+
+        workers = [threading.Thread(target=submit, args=(t,)) for t in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        service.close()
+
+        rows = read_sheet(exporters.daily_export_path(output_dir=self.dir))[1:]
+        po_numbers = [row[2] for row in rows if row[2]]
+        self.assertEqual(len(rows), threads * per_thread * 2)
+        self.assertEqual(len(po_numbers), len(set(po_numbers)))
+        self.assertEqual(len(po_numbers), threads * per_thread)
+
+
+class FlattenTests(SimpleTestCase):
+    def test_frame_matches_the_row_by_row_flatten(self):
+        no_components = sample_po(4, items=2, components=0)
+        missing_fields = {"global": {"PO #": "RPO5"}, "items": [{"Richline Item #": "CD5678Y", "Components": [{}]}]}
+        purchase_orders = [
+            sample_po(1), sample_po(2, items=3, components=4), {"global": {"PO #": "RPO3"}, "items": []},
+            no_components, missing_fields, {"global": {}, "items": [{"Components": [{"Component": "X"}]}]},
+        ]
+
+        rows = exporters.flatten_po_rows({"purchase_orders": purchase_orders})
+        for row in rows:
+            for column in ("Extraction_Date", "Extraction_Time"):
+                if row[column] is not None:
+                    row[column] = {"Extraction_Date": "date", "Extraction_Time": "time"}[column]
+        self.assertEqual(rows, loop_flatten(purchase_orders))
+
+    def test_skip_po_leaves_out_whole_purchase_orders(self):
+        frame = exporters.flatten_po_frame({"purchase_orders": [sample_po(1), sample_po(2)]},
+                                           skip_po=lambda po_number: po_number == "RPO1")
+        self.assertEqual(frame["PO #"].dropna().tolist(), ["RPO2"])
+        self.assertEqual(len(frame), 2)
+
+    def test_flatten_and_split_beat_the_row_by_row_flatten(self):
+        purchase_orders = [sample_po(n, items=4, components=4) for n in range(500)]
+
+        def best_of_five(func):
+            timings = []
+            for _ in range(5):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        loop = best_of_five(lambda: loop_flatten(purchase_orders))
+        groups = best_of_five(lambda: exporters.po_row_groups({"purchase_orders": purchase_orders}))
+        self.assertLess(groups, loop)
+
+    def test_groups_are_positional_slices_per_po(self):
+        groups = exporters.po_row_groups({"purchase_orders": [
+            sample_po(1, items=2, components=3), {"global": {"PO #": "RPO2"}, "items": []}, sample_po(3)]})
+        self.assertEqual([(po_number, len(rows)) for po_number, rows in groups], [("RPO1", 6), ("RPO2", 1), ("RPO3", 2)])
+        self.assertEqual([rows["PO #"].iloc[0] for _, rows in groups], ["RPO1", "RPO2", "RPO3"])
+
+
+class DatasetExportTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    @staticmethod
+    def po(number, vendor, costs, po_date="01/15/2025"):
+        po = sample_po(number, items=2, components=len(costs) // 2)
+        po["global"].update({"Vendor ID #": vendor, "PO Date": po_date, "Gold Rate": "2,400.50"})
+        components = [component for item in po["items"] for component in item["Components"]]
+        for component, cost in zip(components, costs):
+            component.update({"Cost ($)": cost, "Tot. Weight": "0.125 CT"})
+        return po
+
+    def test_parquet_rows_are_dense_and_typed(self):
+        import pyarrow.parquet as pq
+
+        purchase_orders = [self.po(1, "V1", ["1.50", "2.50", "$3.00", "4.00"]), self.po(2, "V2", ["10.00", "1,000.25"]),
+                           {"global": {"PO #": "RPO3", "Vendor ID #": "V3"}, "items": []}]
+        path = exporters.ColumnarExporter(self.dir).write_rows(exporters.flatten_po_frame({"purchase_orders": purchase_orders}))
+
+        table = pq.read_table(path)
+        self.assertEqual(str(table.schema.field("Cost ($)").type), "double")
+        self.assertEqual(str(table.schema.field("Gold Rate").type), "double")
+        self.assertEqual(str(table.schema.field("PO Date").type), "date32[day]")
+        frame = table.to_pandas()
+        self.assertEqual(frame["Vendor ID #"].tolist(), ["V1"] * 4 + ["V2"] * 2 + ["V3"])
+        self.assertEqual(frame.groupby("Vendor ID #")["Cost ($)"].sum().to_dict(), {"V1": 11.0, "V2": 1010.25, "V3": 0.0})
+        self.assertEqual(frame["Gold Rate"].iloc[5], 2400.5)
+        self.assertEqual(frame["Job #"].iloc[:4].tolist(), ["RFP10", "RFP10", "RFP11", "RFP11"])
+        self.assertEqual(frame["Weight Unit"].iloc[0], "CT")
+        self.assertEqual(str(frame["PO Date"].iloc[3]), "2025-01-15")
+
+
+class RasterPlanTests(SimpleTestCase):
+    LETTER = (612.0, 792.0)
+
+    def test_rgb_pages_over_budget_are_refused(self):
+        with self.assertRaises(MemoryBudgetExceeded):
+            plan_rasterization(5, self.LETTER, 300, 10 * MB, 200, channels=3)
+
+    def test_grayscale_pages_stream_within_the_same_budget(self):
+        plan = plan_rasterization(5, self.LETTER, 300, 10 * MB, 200, channels=1)
+        self.assertEqual((plan.dpi, plan.streaming), (300, True))
+        self.assertLess(plan.estimated_bytes, 10 * MB)
+
+    def test_grayscale_downshift_fits_where_rgb_has_to_stream(self):
+        budget = 25 * MB
+        self.assertEqual(plan_rasterization(5, self.LETTER, 300, budget, 200, channels=1).dpi, 200)
+        self.assertTrue(plan_rasterization(5, self.LETTER, 300, budget, 200, channels=3).streaming)
+
+    def test_extractor_plans_with_its_renderers_channels(self):
+        extractor = HybridPDFOCRExtractor()
+        extractor.memory_budget_mb = 10
+        debug = {"pdf_info": {"pages": 5, "page_size_pts": self.LETTER}}
+
+        extractor.renderer = "pdf2image"
+        with self.assertRaises(MemoryBudgetExceeded):
+            extractor.plan_rasterization(300, debug)
+
+        if PdfiumRenderer.available():
+            extractor.renderer = "pdfium"
+            self.assertTrue(extractor.plan_rasterization(300, debug).streaming)
+
+
+@unittest.skipUnless(PdfiumRenderer.available(), "needs pypdfium2")
+class PageTriageExtractionTests(ExtractorTestCase):
+    def test_extraction_with_page_classification_enabled(self):
+        self.extractor.classify_pages = True
+        self.ocr(lambda image: "\n".join(WARM_UP_LINES))
+        path = self.write_pdf(generate_document(POSpec(seed=1)).pages)
+
+        result = self.extractor.extract_with_adaptive_quality(path)
+        self.assertNotIn("error", result, result.get("details"))
+        self.assertIn("page_classes", result["debug"])
+
+        result = self.extractor.extract_with_adaptive_quality(path, force_full=True)
+        self.assertNotIn("error", result, result.get("details"))
+        self.assertNotIn("page_classes", result["debug"])
+
+
+class RenderDpiExtractionTests(ExtractorTestCase):
+    def test_pages_are_ocrd_with_their_render_dpi(self):
+        self.ocr(lambda image: "\n".join(WARM_UP_LINES))
+        path = self.write_pdf(generate_document(POSpec(seed=1)).pages)
+        for pipeline_workers in (None, {"rasterize": 1, "preprocess": 1, "ocr": 1}):
+            self.extractor.pipeline_workers = pipeline_workers
+            with mock.patch.object(tesseract_raw, "image_to_string", wraps=tesseract_raw.image_to_string) as ocr:
+                result = self.extractor.extract_with_adaptive_quality(path)
+            self.assertNotIn("error", result, result.get("details"))
+            self.assertEqual({call.kwargs.get("dpi") for call in ocr.call_args_list}, {self.extractor.accurate_dpi})
+
+
+class EarlyTerminationTests(SimpleTestCase):
+    PO_PAGE = generate_document(POSpec(seed=2)).pages[0]
+
+    def extract_text(self, pages, early_termination=True):
+        """OCR text of ``pages`` (lists of lines); each fake page image carries its index as its pixel value"""
+        extractor = HybridPDFOCRExtractor()
+        extractor.early_termination = early_termination
+        images = [np.full((4, 4), index, dtype=np.uint8) for index in range(len(pages))]
+        string_patch, data_patch = fake_tesseract(lambda image: "\n".join(pages[int(image[0, 0])]))
+        debug = {"processing_steps": []}
+        with string_patch, data_patch:
+            all_text, _, _ = extractor.extract_text_with_coordinates(images, debug)
+        return all_text, debug
+
+    def test_stops_at_an_appendix_after_the_last_po(self):
+        all_text, debug = self.extract_text([self.PO_PAGE, TERMS_LINES, TERMS_LINES])
+        self.assertNotIn("#page 2", all_text)
+        self.assertEqual(debug["early_termination"]["stopped_before_page"], 2)
+
+    def test_components_below_the_header_band_keep_the_page(self):
+        continued = ["Notes for the setting department"] + [""] * 30 + [
+            "Supplied by Component Setting Cost Tot. Weight",
+            "By Vendor CS2/2NV-W12 15.00 0.200 CT",
+        ] + self.PO_PAGE[-2:]
+        all_text, debug = self.extract_text([self.PO_PAGE, continued, TERMS_LINES])
+        self.assertIn("CS2/2NV-W12", all_text)
+        self.assertNotIn("#page 3", all_text)
+        self.assertEqual(debug["early_termination"]["stopped_before_page"], 3)
+
+    def test_off_by_default(self):
+        self.assertFalse(HybridPDFOCRExtractor().early_termination)
+        all_text, debug = self.extract_text([self.PO_PAGE, TERMS_LINES, TERMS_LINES], early_termination=False)
+        self.assertIn("#page 3", all_text)
+        self.assertNotIn("early_termination", debug)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux") and shutil.which("sh"), "needs a POSIX shell")
+class OCRWorkerFailureTests(SimpleTestCase):
+    def setUp(self):
+        # A "tesseract" that kills the worker process running it
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        killer = os.path.join(directory, "tesseract")
+        with open(killer, "w") as f:
+            f.write("#!/bin/sh\nkill -9 $PPID\n")
+        os.chmod(killer, os.stat(killer).st_mode | stat.S_IEXEC)
+
+        self.pool = OCRProcessPool(1)
+        self.addCleanup(self.pool.shutdown)
+        for patch in (mock.patch("pytesseract.pytesseract.tesseract_cmd", killer),
+                      mock.patch("extractor.extractor.get_ocr_pool", return_value=self.pool),
+                      *fake_tesseract(lambda image: "PURCHASE ORDER RPO1\nBy Vendor CS1/1.5NV-ABC 12.50 0.123 CT")):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.extractor = HybridPDFOCRExtractor()
+        self.extractor.ocr_processes = 1
+        self.image = np.full((8, 8), 255, dtype=np.uint8)
+
+    def test_page_with_boxes_is_retried_in_process(self):
+        words = []
+        page_text = self.extractor.ocr_page_with_coordinates(0, self.image, words)
+        self.assertIn("RPO1", page_text)
+        self.assertEqual([word["text"] for word in words][:3], ["PURCHASE", "ORDER", "RPO1"])
+        self.assertEqual(len(self.pool.store), 0)
+
+    def test_simple_extraction_keeps_the_page(self):
+        all_text, _ = self.extractor.extract_text_simple([self.image, self.image])
+        self.assertIn("#page 1\nPURCHASE ORDER RPO1", all_text)
+        self.assertIn("#page 2\nPURCHASE ORDER RPO1", all_text)
+
+
+class StagedPipelineTests(SimpleTestCase):
+    @staticmethod
+    def jitter(func):
+        def stage(item):
+            time.sleep(random.uniform(0, 0.005))
+            return func(item)
+        return stage
+
+    def test_results_come_back_in_input_order(self):
+        pipeline = StagedPipeline([
+            Stage("double", self.jitter(lambda n: n * 2), 3),
+            Stage("drop_thirds", self.jitter(lambda n: None if n % 3 == 0 else n + 1), 4),
+        ], queue_size=2)
+        results = list(pipeline.run(range(50)))
+        self.assertEqual([index for index, _ in results], list(range(50)))
+        self.assertEqual([result for _, result in results], [None if n * 2 % 3 == 0 else n * 2 + 1 for n in range(50)])
+        self.assertEqual(pipeline.stats()["stages"]["double"]["items"], 50)
+
+    def test_stage_error_is_raised_from_run(self):
+        def fail_on_seven(n):
+            if n == 7:
+                raise ValueError("page 7")
+            return n
+
+        pipeline = StagedPipeline([Stage("ok", self.jitter(lambda n: n), 2), Stage("fail", fail_on_seven, 2)])
+        with self.assertRaisesMessage(ValueError, "page 7"):
+            list(pipeline.run(range(100)))
+        self.assertFalse(any(thread.is_alive() for thread in pipeline._threads))
+
+    def test_closing_early_cancels_the_rest(self):
+        fed = []
+
+        def items():
+            for n in range(1000):
+                fed.append(n)
+                yield n
+
+        pipeline = StagedPipeline([Stage("slow", self.jitter(lambda n: n), 2)], queue_size=2)
+        results = pipeline.run(items())
+        for index, _ in results:
+            if index == 3:
+                break
+        results.close()
+        self.assertFalse(any(thread.is_alive() for thread in pipeline._threads))
+        # Backpressure: only a few pages beyond the consumer's were ever fed
+        self.assertLess(len(fed), 20)
+
+
+class PipelinedExtractionTests(ExtractorTestCase):
+    def test_pipeline_traces_every_stage_and_keeps_page_order(self):
+        self.extractor.pipeline_workers = {"rasterize": 2, "preprocess": 1, "ocr": 2}
+        self.ocr(lambda image: "\n".join(WARM_UP_LINES))
+        path = self.write_pdf(generate_document(POSpec(seed=1)).pages)
+
+        with tracing() as trace:
+            result = self.extractor.extract_with_adaptive_quality(path)
+        self.assertNotIn("error", result, result.get("details"))
+        names = {event["name"] for event in trace.events}
+        self.assertTrue({"rasterize_page", "preprocess", "ocr_text"} <= names, names)
+        self.assertEqual(set(result["debug"]["pipeline"]["stages"]), {"rasterize", "preprocess", "ocr"})
+
+
+class ComponentTableTests(SimpleTestCase):
+    ROWS = (100, 160, 220, 280)
+    COLS = (100, 300, 500, 700, 900, 1100)
+
+    def page(self):
+        image = np.full((800, 1200), 255, dtype=np.uint8)
+        for y in self.ROWS:
+            cv2.line(image, (self.COLS[0], y), (self.COLS[-1], y), 0, 3)
+        for x in self.COLS:
+            cv2.line(image, (x, self.ROWS[0]), (x, self.ROWS[-1]), 0, 3)
+        return image
+
+    def words(self, rows):
+        """Word boxes for each cell's text, as the full-page OCR pass would return them"""
+        boxes = []
+        for row, cells in enumerate(rows):
+            for col, text in enumerate(cells):
+                for index, word in enumerate(text.split()):
+                    boxes.append({"text": word, "x": self.COLS[col] + 10 + 60 * index, "y": self.ROWS[row] + 20,
+                                  "width": 50, "height": 20, "page": 0})
+        return boxes
+
+    def test_cells_are_read_from_the_page_words(self):
+        words = self.words([
+            ("Supplied by", "Component", "Setting", "Cost", "Tot. Weight"),
+            ("By Vendor", "cs1/1.5nv-abc", "Prong", "| 12.50", "0.123 CT"),
+            ("Customer Supply", "CS3/2.5PS-W12", "", "$1,024.99", "1.352 CT |"),
+        ])
+        with mock.patch("extractor.tesseract_raw.image_to_string", side_effect=AssertionError("no OCR")):
+            tables = read_component_tables(self.page(), words)
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(tables[0]["columns"], ["Supply Policy", "Component", None, "Cost ($)", "Tot. Weight"])
+        self.assertEqual(tables[0]["components"], [
+            {"Component": "CS1/1.5NV-ABC", "Cost ($)": "12.50", "Tot. Weight": "0.123 CT", "Supply Policy": "By Vendor"},
+            {"Component": "CS3/2.5PS-W12", "Cost ($)": "1024.99", "Tot. Weight": "1.352 CT", "Supply Policy": "Customer Supply"},
+        ])
+
+    def test_digit_confusions_are_mapped_not_deleted(self):
+        self.assertEqual(clean_cell("Cost ($)", "1,O24.5O"), "1024.50")
+        self.assertEqual(clean_cell("Tot. Weight", "O.l25 CT"), "0.125 CT")
+        self.assertEqual(clean_cell("Cost ($)", "S8.I0"), "58.10")
+
+    def test_unreadable_cells_are_kept_as_read(self):
+        self.assertEqual(clean_cell("Cost ($)", "| 12.5x"), "12.5x")
+        self.assertEqual(clean_cell("Tot. Weight", "?.12 CT"), "?.12 CT")
+        self.assertEqual(clean_cell("Component", "CS1 x"), "CS1 x")
+
+    def test_a_table_without_a_component_header_is_ignored(self):
+        words = self.words([("Gold", "Silver", "Platinum", "Rate", "Date"), ("1", "2", "3", "4", "5"), ("6", "7", "8", "9", "10")])
+        self.assertEqual(read_component_tables(self.page(), words), [])
+
+
+class HeaderFieldTests(SimpleTestCase):
+    def test_fields_are_read_from_the_page_words_at_learned_positions(self):
+        image = np.full((1000, 800), 255, dtype=np.uint8)
+        cv2.putText(image, "RICHLINE GROUP", (50, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+        signature = header_signature(image)
+        extractor = HybridPDFOCRExtractor()
+        extractor.field_rois = True
+        extractor.layout_memory = {"field_positions": {"po": {
+            "hash": signature["hash"], "layout": signature["layout"], "n": 1,
+            "fields": {"PO Date": {"box": [0.1, 0.1, 0.3, 0.12], "n": 1},
+                       "Gold Rate": {"box": [0.5, 0.1, 0.7, 0.12], "n": 1},
+                       "Location": {"box": [0.1, 0.2, 0.3, 0.22], "n": 1}},
+        }}}
+        words = [{"text": text, "x": x, "y": y, "width": 60, "height": 16, "page": 0} for text, x, y in (
+            ("Date", 20, 102), ("11/28/2025", 90, 102), ("1,973.27", 410, 102), ("Vendor", 410, 300))]
+        debug = {}
+        with mock.patch("extractor.tesseract_raw.image_to_string", side_effect=AssertionError("no OCR")):
+            extractor.read_header_fields(0, image, words, debug)
+        self.assertEqual(debug["header_fields"], [{"page": 0, "layout": "po", "fields": {
+            "PO Date": "11/28/2025", "Gold Rate": "1973.27", "Location": ""}}])
+
+
+class ExtractDirectoryCommandTests(SimpleTestCase):
+    def test_failed_pdfs_are_not_checkpointed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with open(os.path.join(directory, "broken.pdf"), "wb") as f:
+            f.write(b"not a pdf")
+
+        for _ in range(2):
+            out = io.StringIO()
+            call_command("extract_directory", directory, workers=1, stdout=out, stderr=io.StringIO())
+            self.assertIn("1 PDFs found, 0 already done, 1 to extract", out.getvalue())
+        self.assertEqual(open(os.path.join(directory, "extraction_results.jsonl.checkpoint")).read(), "")
+
+
+class TesseractRawTests(SimpleTestCase):
+    def test_grayscale_and_rgb_netpbm(self):
+        gray = np.arange(6, dtype=np.uint8).reshape(2, 3)
+        self.assertEqual(tesseract_raw.netpbm_bytes(gray), b"P5\n3 2\n255\n" + bytes(range(6)))
+        rgb = np.zeros((2, 3, 3), dtype=np.uint8)
+        self.assertEqual(tesseract_raw.netpbm_bytes(rgb)[:11], b"P6\n3 2\n255\n")
+        self.assertEqual(len(tesseract_raw.netpbm_bytes(rgb)), 11 + 18)
+
+    def test_pil_images_are_converted(self):
+        from PIL import Image
+
+        image = Image.new("RGBA", (3, 2), (255, 0, 0, 255))
+        self.assertTrue(tesseract_raw.netpbm_bytes(image).startswith(b"P6\n3 2\n255\n\xff\x00\x00"))
+        self.assertTrue(tesseract_raw.netpbm_bytes(Image.new("1", (3, 2))).startswith(b"P5\n"))
+
+    def test_unsupported_arrays_are_refused(self):
+        with self.assertRaises(ValueError):
+            tesseract_raw.netpbm_bytes(np.zeros((2, 3), dtype=np.uint16))
+        with self.assertRaises(ValueError):
+            tesseract_raw.netpbm_bytes(np.zeros((2, 3, 4), dtype=np.uint8))
+
+    def test_tsv_round_trip(self):
+        tsv = ("level\tpage_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+               "1\t1\t0\t0\t100\t50\t-1\t\n"
+               "5\t1\t10\t20\t30\t12\t96.5\tRPO123\n"
+               "5\t1\t45\t20\t8\t12\t91")
+        data = tesseract_raw._parse_tsv(tsv)
+        self.assertEqual(list(data), ["level", "page_num", "left", "top", "width", "height", "conf", "text"])
+        self.assertEqual(data["text"], ["", "RPO123", ""])
+        self.assertEqual(data["left"], [0, 10, 45])
+        self.assertEqual(data["conf"], [-1, 96.5, 91])
+        self.assertEqual(tesseract_raw._parse_tsv(""), {})
+
+    def test_render_dpi_is_passed_to_tesseract(self):
+        completed = mock.Mock(returncode=0, stdout=b"text", stderr=b"")
+        with mock.patch("extractor.tesseract_raw.subprocess.run", return_value=completed) as run:
+            tesseract_raw.image_to_string(np.zeros((2, 2), dtype=np.uint8), dpi=200)
+            self.assertEqual(run.call_args.args[0][-2:], ["--dpi", "200"])
+
+            from PIL import Image
+
+            image = Image.new("L", (2, 2))
+            image.info["dpi"] = (300, 300)
+            tesseract_raw.image_to_data(image, config="--psm 6")
+            self.assertEqual(run.call_args.args[0][3:], ["--psm", "6", "--dpi", "300", "tsv"])
+
+            tesseract_raw.image_to_string(np.zeros((2, 2), dtype=np.uint8))
+            self.assertNotIn("--dpi", run.call_args.args[0])
+
+    def test_thread_limit_goes_to_the_subprocess_only(self):
+        completed = mock.Mock(returncode=0, stdout=b"text", stderr=b"")
+        with mock.patch("extractor.tesseract_raw.subprocess.run", return_value=completed) as run, \
+                mock.patch.dict(os.environ, {"OMP_THREAD_LIMIT": "8"}):
+            tesseract_raw.image_to_string(np.zeros((2, 2), dtype=np.uint8), threads=2)
+            self.assertEqual(run.call_args.kwargs["env"]["OMP_THREAD_LIMIT"], "2")
+            self.assertEqual(os.environ["OMP_THREAD_LIMIT"], "8")
+            tesseract_raw.image_to_data(np.zeros((2, 2), dtype=np.uint8))
+            self.assertIsNone(run.call_args.kwargs["env"])
+
+
+class BenchmarkExtractionCommandTests(SimpleTestCase):
+    def test_missing_or_invalid_baseline_fails_before_the_run(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        invalid = os.path.join(directory, "baseline.json")
+        with open(invalid, "w") as f:
+            f.write("{not json")
+
+        with mock.patch("extractor.management.commands.benchmark_extraction.generate_corpus") as generate:
+            for path, message in ((os.path.join(directory, "missing.json"), "not found"), (invalid, "Invalid baseline")):
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command("benchmark_extraction", baseline=path, stdout=io.StringIO())
+            generate.assert_not_called()
+
+
+class ResultFileCacheTests(SimpleTestCase):
+    def test_cull_drops_expired_results_before_live_ones(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cache = ResultFileCache(directory, {"TIMEOUT": 3600, "OPTIONS": {"MAX_ENTRIES": 4}})
+        with mock.patch("django.core.cache.backends.filebased.time.time", return_value=time.time() - 7200):
+            for n in range(3):
+                cache.set(f"stale{n}", n)  # expired an hour ago, never read
+        for n in range(3):
+            cache.set(f"live{n}", n)
+
+        self.assertEqual([cache.get(f"live{n}") for n in range(3)], [0, 1, 2])
+        self.assertEqual(len(cache._list_cache_files()), 3)
+
+
+class CoreSchedulerTests(SimpleTestCase):
+    def split(self):
+        budget = current_budget()
+        return budget.render_threads, budget.ocr_workers, budget.tesseract_threads
+
+    def test_one_document_gets_the_cores_and_capped_tesseract_threads(self):
+        scheduler = CoreScheduler(cores=8)
+        with scheduler.document():
+            self.assertEqual(self.split(), (8, 8, 4))
+        with CoreScheduler(cores=2).document():
+            self.assertEqual(self.split(), (2, 2, 2))
+        self.assertIsNone(current_budget())
+
+    def test_cores_are_shared_between_documents_in_flight(self):
+        scheduler = CoreScheduler(cores=8)
+        with scheduler.document():
+            with scheduler.document():
+                self.assertEqual(self.split(), (4, 4, 1))
+                with scheduler.document():
+                    self.assertEqual(self.split(), (2, 2, 1))
+            # The share grows back as documents finish
+            self.assertEqual(self.split(), (8, 8, 4))
+        self.assertEqual(scheduler.in_flight, 0)
+
+    def test_more_documents_than_cores_keep_one_thread_each(self):
+        scheduler = CoreScheduler(cores=2)
+        scheduler.in_flight = 4
+        with scheduler.document():
+            self.assertEqual(self.split(), (1, 1, 1))
+
+    def test_pipelined_documents_run_single_threaded_tesseract(self):
+        scheduler = CoreScheduler(cores=8)
+        with scheduler.document(pipelined=True):
+            self.assertEqual(self.split(), (8, 8, 1))
+        self.assertEqual(scheduler.pipelined, 0)
+
+    def test_budget_reaches_in_process_tesseract_calls(self):
+        extractor = HybridPDFOCRExtractor()
+        image = np.zeros((2, 2), dtype=np.uint8)
+        with mock.patch.object(extractor, "ocr_pool", return_value=None), \
+                mock.patch("extractor.tesseract_raw.image_to_string", return_value="") as image_to_string:
+            extractor.ocr_page(0, image)
+            self.assertIsNone(image_to_string.call_args.kwargs["threads"])
+            with CoreScheduler(cores=8).document():
+                extractor.ocr_page(0, image)
+            self.assertEqual(image_to_string.call_args.kwargs["threads"], 4)
+
+
+class MetricsRenderingTests(SimpleTestCase):
+    def test_counter_and_gauges(self):
+        registry = MetricsRegistry()
+        documents = registry.counter("docs_total", "Documents", ("status",))
+        documents.inc(status="ok")
+        documents.inc(2, status="ok")
+        documents.inc(status='bad "input"\n')
+        registry.gauge("ratio", "A ratio", lambda: 0.25)
+        registry.gauge("unknown", "Nothing observed yet", lambda: None)
+        depth = registry.gauge("depth", "Queue depth")
+        depth.set(3)
+
+        self.assertEqual(registry.render(), "\n".join([
+            "# HELP docs_total Documents",
+            "# TYPE docs_total counter",
+            'docs_total{status="bad \\"input\\"\\n"} 1',
+            'docs_total{status="ok"} 3',
+            "# HELP ratio A ratio",
+            "# TYPE ratio gauge",
+            "ratio 0.25",
+            "# HELP unknown Nothing observed yet",
+            "# TYPE unknown gauge",
+            "# HELP depth Queue depth",
+            "# TYPE depth gauge",
+            "depth 3",
+        ]) + "\n")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(1, 0.5))
+        for value in (0.2, 0.7, 3):
+            latency.observe(value, stage="ocr")
+
+        self.assertEqual(registry.render().splitlines()[2:], [
+            'stage_seconds_bucket{stage="ocr",le="0.5"} 1',
+            'stage_seconds_bucket{stage="ocr",le="1"} 2',
+            'stage_seconds_bucket{stage="ocr",le="+Inf"} 3',
+            'stage_seconds_sum{stage="ocr"} 3.9',
+            'stage_seconds_count{stage="ocr"} 3',
+        ])
+        self.assertEqual(latency.totals(stage="ocr"), (3, 3.9))
+
+    def test_wrong_labels_and_duplicate_names_are_refused(self):
+        registry = MetricsRegistry()
+        documents = registry.counter("docs_total", "Documents", ("status",))
+        with self.assertRaises(ValueError):
+            documents.inc(state="ok")
+        with self.assertRaises(ValueError):
+            registry.gauge("docs_total", "Again")
@@ -0,0 +1,95 @@
+# extractor/tracing.py
+"""Per-extraction timelines in Chrome Trace Event format.
+
+Open the saved JSON in chrome://tracing or https://ui.perfetto.dev: every
+thread that did work for the document gets its own track, with spans for
+each stage, page and parsed RPO/item. ``span()`` is a no-op unless a trace
+is active in the current context, so instrumented code costs nothing when
+tracing is off.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_trace = ContextVar("extraction_trace", default=None)
+
+
+class Trace:
+    """Collects complete ("X") events, one track (tid) per thread"""
+
+    def __init__(self, name=""):
+        self.name = name
+        self.pid = os.getpid()
+        self.events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def _tid(self):
+        thread = threading.current_thread()
+        with self._lock:
+            tid = self._threads.get(thread.ident)
+            if tid is None:
+                tid = self._threads[thread.ident] = len(self._threads) + 1
+                self.events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                                    "args": {"name": thread.name}})
+            return tid
+
+    def add_span(self, name, category, start, end, args=None):
+        """Record a span from two ``time.perf_counter()`` readings"""
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "pid": self.pid,
+            "tid": self._tid(),
+            "ts": round((start - self._origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def to_dict(self):
+        with self._lock:
+            events = list(self.events)
+        process = {"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": self.name or "extraction"}}
+        return {"traceEvents": [process] + events, "displayTimeUnit": "ms"}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"), default=str)
+        return path
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def tracing(name=""):
+    """Make a new Trace current for the block (and for contexts copied from it)"""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name, category="extract", **args):
+    """Time the block as a span on the current thread's track, if a trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, category, start, time.perf_counter(), args)
@@ -1,7 +1,12 @@
 # extractor/urls.py
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.upload_pdf, name="upload_pdf"),
-]
\ No newline at end of file
+    path("api/extract/", api.extract_api, name="extract_api"),
+    path("api/status/", api.extraction_status_api, name="extraction_status_api"),
+    path("api/results/<str:result_id>/", api.extraction_result_api, name="extraction_result_api"),
+    path("api/profiles/<str:profile_id>/", api.profile_api, name="profile_api"),
+    path("api/traces/<str:trace_id>/", api.trace_api, name="trace_api"),
+]
@@ -1,129 +1,15 @@
 # views.py
 import json
 import traceback
-import pandas as pd
-import os
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django import forms
 from datetime import datetime, timedelta
 from io import BytesIO
 
-# Make sure to import the correct class name
-from .extractor import HybridPDFOCRExtractor as FastPDFOCRExtractor
-
-### REFACTORED ###
-# This function now iterates through multiple Purchase Orders
-def export_to_excel(multi_po_data, base_filename="Daily_PO_Extracts"):
-    """Export extracted data from multiple POs to a single daily Excel file on the Desktop."""
-
-    today = datetime.now().strftime("%Y-%m-%d")
-    desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-    filename = os.path.join(desktop_path, f"{base_filename}_{today}.xlsx")
-
-    try:
-        existing_df = pd.read_excel(filename) if os.path.exists(filename) else pd.DataFrame()
-    except Exception as e:
-        print(f"Warning: Could not read existing Excel file '{filename}'. Starting fresh. Error: {e}")
-        existing_df = pd.DataFrame()
-
-    all_new_rows = []
-
-    # Iterate through each purchase order found in the PDF
-    for po_result in multi_po_data.get('purchase_orders', []):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        global_data = po_result.get('global', {})
-        po_number = global_data.get('PO #', 'UNKNOWN')
-
-        # Check if this specific PO already exists in the file
-        po_exists_in_file = False
-        if not existing_df.empty and 'PO #' in existing_df.columns:
-            po_exists_in_file = existing_df['PO #'].astype(str).eq(str(po_number)).any()
-
-        if po_exists_in_file:
-            print(f"Skipping PO# {po_number} as it already exists in the Excel file.")
-            continue # Skip to the next PO
-
-        # Prepare the PO-level data that will be repeated for this PO's first row
-        po_header_data = {
-            'PO #': po_number,
-            'Location': global_data.get('Location', ''),
-            'PO Date': global_data.get('PO Date', ''),
-            'Due Date': global_data.get('Due Date', ''),
-            'Vendor ID #': global_data.get('Vendor ID #', ''),
-            'Order Type': global_data.get('Order Type', ''),
-            'Gold Rate': global_data.get('Gold Rate', ''),
-            'Platinum Rate': global_data.get('Platinum Rate', ''),
-            'Silver Rate': global_data.get('Silver Rate', ''),
-            'Extraction_Time': timestamp,
-            'Extraction_Date': today
-        }
-
-        # Process each item within the current PO
-        items_in_po = po_result.get('items', [])
-        if not items_in_po: # Handle case where a PO has global data but no items
-             # Add a single row with just the PO header data
-            row = po_header_data.copy()
-            # Fill in blank item/component data
-            row.update({ 'Job #': 'N/A', 'Richline Item #': 'N/A', 'Component': 'N/A'})
-            all_new_rows.append(row)
-            continue
-
-        for item_idx, item in enumerate(items_in_po):
-            item_data = {
-                'Job #': item.get('Job #', ''),
-                'Richline Item #': item.get('Richline Item #', ''),
-                'Vendor Item #': item.get('Vendor Item #', ''),
-                'Fin Weight (Gold)': item.get('Fin Weight (Gold)', ''),
-                'Stone Labor': item.get('Stone Labor', ''),
-            }
-
-            components = item.get('Components', [])
-            if not components: # Handle item with no components
-                row = item_data.copy()
-                if item_idx == 0: # Add PO header to the first item of this PO
-                    row.update(po_header_data)
-                # Fill in blank component data
-                row.update({ 'Component': 'N/A', 'Supply Policy': 'N/A'})
-                all_new_rows.append(row)
-                continue
-
-            for comp_idx, component in enumerate(components):
-                row = {}
-                # Add PO header and item data only to the very first row of the item
-                if comp_idx == 0:
-                    row.update(item_data)
-                    if item_idx == 0:
-                        row.update(po_header_data)
-
-                # Always add component data
-                row.update({
-                    'Component': component.get('Component', ''),
-                    'Supply Policy': component.get('Supply Policy', ''),
-                    'Tot. Weight': component.get('Tot. Weight', ''),  # Fixed field name
-                    'Cost ($)': component.get('Cost ($)', ''),  # Fixed field name
-                })
-                all_new_rows.append(row)
-
-    if not all_new_rows:
-        print("No new data to add to Excel.")
-        return filename, os.path.exists(filename)
-
-    new_df = pd.DataFrame(all_new_rows)
-    # Define the desired column order
-    column_order = [
-        'Extraction_Date', 'Extraction_Time', 'PO #', 'Location', 'PO Date', 'Due Date', 'Vendor ID #', 'Order Type',
-        'Gold Rate', 'Platinum Rate', 'Silver Rate', 'Job #', 'Richline Item #', 'Vendor Item #',
-        'Fin Weight (Gold)', 'Stone Labor', 'Component', 'Supply Policy', 'Tot. Weight', 'Cost ($)'
-    ]
-    # Reorder the DataFrame, adding missing columns as blank
-    new_df = new_df.reindex(columns=column_order)
-
-    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-    combined_df.to_excel(filename, index=False)
-
-    return filename, os.path.exists(filename)
-
+from .admission import AdmissionRejected
+from .pool import extract_document
+from .profiling import force_full_requested, profiling_requested, tracing_requested
 
 class PDFUploadForm(forms.Form):
     pdf_file = forms.FileField(
@@ -144,8 +30,19 @@ def upload_pdf(request):
         try:
             pdf_file = request.FILES['pdf_file']
             
-            extractor = FastPDFOCRExtractor()
-            result = extractor.extract_with_adaptive_quality(pdf_file)
+            try:
+                result = extract_document(pdf_file, profile=profiling_requested(request),
+                                          trace=tracing_requested(request),
+                                          force_full=force_full_requested(request))
+            except AdmissionRejected as e:
+                context = {
+                    'error': {'message': 'The server is busy processing other documents.', 'details': f'Please retry in {e.retry_after} seconds.'},
+                    'success': False,
+                    'form': PDFUploadForm()
+                }
+                response = render(request, 'upload.html', context, status=503)
+                response['Retry-After'] = str(e.retry_after)
+                return response
             
             if "error" in result:
                 context = {